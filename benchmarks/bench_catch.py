@@ -0,0 +1,64 @@
+"""Per-iteration overhead of catch() compared with a bare try/except.
+
+Run with ``python benchmarks/bench_catch.py`` against an installed
+exceptiongroup (or with ``PYTHONPATH=.`` from the repository root).
+"""
+
+import timeit
+
+from exceptiongroup import ExceptionGroup, catch
+
+NUMBER = 100000
+
+
+def handler(exc):
+    pass
+
+
+def bare_no_exception():
+    try:
+        pass
+    except ValueError:
+        pass
+
+
+def catch_no_exception():
+    with catch(ValueError, handler):
+        pass
+
+
+def bare_exception():
+    try:
+        raise ValueError
+    except ValueError:
+        pass
+
+
+def catch_exception():
+    with catch(ValueError, handler):
+        raise ValueError
+
+
+def catch_group():
+    with catch(Exception, handler):
+        raise ExceptionGroup("group", [ValueError(), KeyError()], ["a", "b"])
+
+
+def main():
+    for fn in [
+        bare_no_exception,
+        catch_no_exception,
+        bare_exception,
+        catch_exception,
+        catch_group,
+    ]:
+        elapsed = min(timeit.repeat(fn, number=NUMBER, repeat=5))
+        print(
+            "{:>20}: {:8.3f} us/iteration".format(
+                fn.__name__, elapsed / NUMBER * 1e6
+            )
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,54 @@
+"""Timing for building ExceptionGroups.
+
+Run with ``python benchmarks/bench_construct.py`` against an installed
+exceptiongroup (or with ``PYTHONPATH=.`` from the repository root).
+
+Compares the public constructor, which copies and checks its arguments, with
+the trusted ``ExceptionGroup._from_validated`` path used internally by split
+and catch, and with ``copy.copy``.
+"""
+
+import copy
+import timeit
+
+from exceptiongroup import ExceptionGroup
+
+SIZES = [10, 1000, 100000]
+
+
+def main():
+    for size in SIZES:
+        exceptions = [ValueError(i) for i in range(size)]
+        sources = ["source {}".format(i) for i in range(size)]
+        group = ExceptionGroup("group", exceptions, sources)
+        cases = [
+            (
+                "constructor",
+                lambda: ExceptionGroup("group", exceptions, sources),
+            ),
+            (
+                "constructor(gen)",
+                lambda: ExceptionGroup(
+                    "group", (exc for exc in exceptions), iter(sources)
+                ),
+            ),
+            (
+                "_from_validated",
+                lambda: ExceptionGroup._from_validated(
+                    "group", exceptions, sources
+                ),
+            ),
+            ("copy.copy", lambda: copy.copy(group)),
+        ]
+        number = max(1, 100000 // size)
+        for name, fn in cases:
+            elapsed = min(timeit.repeat(fn, number=number, repeat=5))
+            print(
+                "{:>7} children {:>16}: {:10.2f} us".format(
+                    size, name, elapsed / number * 1e6
+                )
+            )
+
+
+if __name__ == "__main__":
+    main()
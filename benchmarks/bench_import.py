@@ -0,0 +1,44 @@
+"""Time taken by ``import exceptiongroup``, as reported by
+``python -X importtime``, and the slowest modules it pulls in.
+
+Run with ``python benchmarks/bench_import.py`` against an installed
+exceptiongroup (or with ``PYTHONPATH=.`` from the repository root).
+"""
+
+import subprocess
+import sys
+
+REPEAT = 5
+SHOWN = 10
+
+
+def import_times():
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", "import exceptiongroup"],
+        stderr=subprocess.PIPE,
+        universal_newlines=True,
+        check=True,
+    )
+    times = {}
+    # lines look like "import time: self [us] | cumulative | imported package"
+    for line in result.stderr.splitlines()[1:]:
+        _, cumulative, name = line.split("|")
+        times[name.strip()] = int(cumulative)
+    return times
+
+
+def main():
+    runs = [import_times() for _ in range(REPEAT)]
+    best = {name: min(run.get(name, 0) for run in runs) for name in runs[0]}
+    print(
+        "import exceptiongroup: {:8.2f} ms".format(
+            best["exceptiongroup"] / 1000
+        )
+    )
+    slowest = sorted(best.items(), key=lambda item: item[1], reverse=True)
+    for name, cumulative in slowest[1:SHOWN]:
+        print("{:>30}: {:8.2f} ms".format(name, cumulative / 1000))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,64 @@
+"""Memory used by ExceptionGroups, measured with tracemalloc.
+
+Run with ``python benchmarks/bench_memory.py`` against an installed
+exceptiongroup (or with ``PYTHONPATH=.`` from the repository root).
+
+Reports the bytes allocated per leaf by the groups themselves; the leaf
+exceptions are created before measuring starts, so they are not counted.
+The sources are built at runtime like in a real fan-out ("worker task 3"),
+so equal descriptions are separate string objects unless interned.
+"""
+
+import tracemalloc
+
+from exceptiongroup import ExceptionGroup
+
+LEAVES = 100000
+WORKERS = 16
+
+
+def wide(exceptions, **kwargs):
+    sources = ("worker task {}".format(i % WORKERS) for i in range(LEAVES))
+    return ExceptionGroup("wide", exceptions, sources, **kwargs)
+
+
+def nested(exceptions, **kwargs):
+    # One group per worker, each holding that worker's failures.
+    groups = []
+    for worker in range(WORKERS):
+        children = exceptions[worker::WORKERS]
+        sources = ("shard {}".format(worker) for _ in children)
+        groups.append(ExceptionGroup("worker", children, sources, **kwargs))
+    sources = ["worker task {}".format(i) for i in range(WORKERS)]
+    return ExceptionGroup("nested", groups, sources, **kwargs)
+
+
+def measure(build, **kwargs):
+    exceptions = [ValueError(i) for i in range(LEAVES)]
+    tracemalloc.start()
+    group = build(exceptions, **kwargs)
+    current, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    del group
+    return current / LEAVES
+
+
+def main():
+    cases = [("wide", wide, {}), ("nested", nested, {})]
+    try:
+        ExceptionGroup("probe", [], [], intern_sources=True)
+    except TypeError:
+        pass
+    else:
+        cases += [
+            ("wide, interned", wide, {"intern_sources": True}),
+            ("nested, interned", nested, {"intern_sources": True}),
+        ]
+    for name, build, kwargs in cases:
+        print(
+            "{:>16}: {:6.1f} bytes/leaf".format(name, measure(build, **kwargs))
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,92 @@
+"""Timing for exceptiongroup.split and partition over trees of growing size.
+
+Run with ``python benchmarks/bench_split.py`` against an installed
+exceptiongroup (or with ``PYTHONPATH=.`` from the repository root).
+
+For every tree shape the time per node should stay roughly constant as the
+tree grows; a per-node time that climbs with the node count means split has
+gone super-linear.
+
+The last section compares one partition() into several types against calling
+split() once per type.
+"""
+
+import timeit
+
+from exceptiongroup import ExceptionGroup, split, partition
+
+
+def wide_tree(n):
+    exceptions = [
+        RuntimeError(i) if i % 2 else ValueError(i) for i in range(n)
+    ]
+    return ExceptionGroup("wide", exceptions, [str(i) for i in range(n)])
+
+
+def deep_tree(n):
+    group = ExceptionGroup(
+        "leaf", [RuntimeError(), ValueError()], ["runtime", "value"]
+    )
+    for i in range(n - 1):
+        group = ExceptionGroup("deep", [group], ["level {}".format(i)])
+    return group
+
+
+def balanced_tree(n):
+    nodes = [RuntimeError(i) if i % 2 else ValueError(i) for i in range(n)]
+    while len(nodes) > 1:
+        pairs = [nodes[i : i + 2] for i in range(0, len(nodes), 2)]
+        nodes = [
+            ExceptionGroup("balanced", pair, ["left", "right"][: len(pair)])
+            for pair in pairs
+        ]
+    return nodes[0]
+
+
+SHAPES = [
+    ("wide", wide_tree),
+    ("deep", deep_tree),
+    ("balanced", balanced_tree),
+]
+SIZES = [1000, 4000, 16000]
+
+
+def main():
+    for name, make_tree in SHAPES:
+        for size in SIZES:
+            group = make_tree(size)
+            number = 5
+            elapsed = timeit.timeit(
+                lambda: split(RuntimeError, group), number=number
+            )
+            per_node = elapsed / number / size * 1e9
+            print(
+                "{:>8} {:>6} nodes: {:8.2f} ms/split {:8.1f} ns/node".format(
+                    name, size, elapsed / number * 1e3, per_node
+                )
+            )
+
+    categories = [
+        type("Category{}Error".format(i), (Exception,), {}) for i in range(8)
+    ]
+    exceptions = [categories[i % 8]() for i in range(16000)]
+    group = ExceptionGroup(
+        "mixed", exceptions, [str(i) for i in range(len(exceptions))]
+    )
+
+    def repeated_split():
+        rest = group
+        for category in categories:
+            _, rest = split(category, rest)
+
+    number = 5
+    for name, fn in [
+        ("split x8", repeated_split),
+        ("partition", lambda: partition(dict.fromkeys(categories), group)),
+    ]:
+        elapsed = timeit.timeit(fn, number=number)
+        print("{:>10}: {:8.2f} ms".format(name, elapsed / number * 1e3))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,146 @@
+"""Throughput and memory benchmarks for the main operations on
+ExceptionGroups, over trees of several shapes.
+
+Run with ``python -m pytest benchmarks`` from the repository root; see
+conftest.py for saving and comparing against a baseline.
+"""
+
+import copy
+import sys
+import traceback
+
+import pytest
+
+from exceptiongroup import ExceptionGroup, catch, split
+
+LEAVES = 512
+DEPTH = 100
+
+
+class CategoryError(Exception):
+    pass
+
+
+class SubCategoryError(CategoryError):
+    pass
+
+
+MIXED_TYPES = [
+    ValueError,
+    KeyError,
+    IndexError,
+    LookupError,
+    OSError,
+    FileNotFoundError,
+    CategoryError,
+    SubCategoryError,
+]
+
+
+def raised(exc):
+    """`exc`, with a traceback."""
+    try:
+        raise exc
+    except BaseException as e:
+        return e
+
+
+def leaves(n, types=(RuntimeError, ValueError)):
+    return [raised(types[i % len(types)](i)) for i in range(n)]
+
+
+def group_of(exceptions, message="group"):
+    return ExceptionGroup(
+        message, exceptions, [str(i) for i in range(len(exceptions))]
+    )
+
+
+def wide_tree():
+    return group_of(leaves(LEAVES), "wide")
+
+
+def deep_tree():
+    group = group_of(leaves(2), "leaf")
+    for _ in range(DEPTH - 1):
+        group = group_of([group], "deep")
+    return group
+
+
+def balanced_tree():
+    nodes = leaves(LEAVES)
+    while len(nodes) > 1:
+        nodes = [
+            group_of(nodes[i : i + 2], "balanced")
+            for i in range(0, len(nodes), 2)
+        ]
+    return nodes[0]
+
+
+def shared_tree():
+    # the same subgroup, and the same leaf, appearing many times
+    subgroup = group_of(leaves(16), "shared")
+    leaf = raised(ValueError("shared"))
+    return group_of([subgroup] * 16 + [leaf] * (LEAVES // 2), "shared")
+
+
+def mixed_tree():
+    return group_of(leaves(LEAVES, MIXED_TYPES), "mixed")
+
+
+SHAPES = {
+    "wide": wide_tree,
+    "deep": deep_tree,
+    "balanced": balanced_tree,
+    "shared": shared_tree,
+    "mixed": mixed_tree,
+}
+
+
+@pytest.fixture(params=sorted(SHAPES))
+def tree(request):
+    return SHAPES[request.param]()
+
+
+def handler(exc):
+    pass
+
+
+def test_construct(benchmark, tree):
+    message, exceptions, sources = tree.message, tree.exceptions, tree.sources
+    benchmark(lambda: ExceptionGroup(message, exceptions, sources))
+
+
+def test_copy(benchmark, tree):
+    benchmark(lambda: copy.copy(tree))
+
+
+def test_split(benchmark, tree):
+    benchmark(lambda: split(ValueError, tree))
+
+
+def test_catch(benchmark, tree):
+    def catch_tree():
+        try:
+            with catch(ValueError, handler):
+                raise tree
+        except ExceptionGroup:
+            # what wasn't caught
+            pass
+        finally:
+            # raising the same group again would keep extending these
+            tree.__traceback__ = None
+            tree.__context__ = None
+
+    benchmark(catch_tree)
+
+
+# The patched TracebackException can't format on Python 3.10+.  The benchmark
+# is left out there rather than skipped, since pytest would format the skip.
+if sys.version_info < (3, 10):
+
+    def test_format(benchmark, tree):
+        benchmark(
+            lambda: traceback.format_exception(
+                type(tree), tree, tree.__traceback__
+            )
+        )
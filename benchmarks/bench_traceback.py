@@ -0,0 +1,64 @@
+"""Timing for capturing and formatting the traceback of a wide group.
+
+Run with ``python benchmarks/bench_traceback.py`` against an installed
+exceptiongroup (or with ``PYTHONPATH=.`` from the repository root).  Needs a
+Python version that the traceback monkeypatching supports (< 3.10).
+
+The group has 10k children, each with a chain of contexts, and sits at the
+end of a long chain itself, so every child starts out with many exceptions
+already seen.
+"""
+
+import time
+import traceback
+
+from exceptiongroup import ExceptionGroup
+
+CHILDREN = 10000
+CHAIN = 300
+
+
+def chained_error(length):
+    error = None
+    for i in range(length):
+        try:
+            try:
+                raise error if error is not None else KeyError(i)
+            except BaseException:
+                raise ValueError(i)
+        except ValueError as e:
+            error = e
+    return error
+
+
+def build_group():
+    children = [chained_error(3) for _ in range(CHILDREN)]
+    group = ExceptionGroup(
+        "wide", children, ["child {}".format(i) for i in range(CHILDREN)]
+    )
+    try:
+        try:
+            raise chained_error(CHAIN)
+        except ValueError:
+            raise group
+    except ExceptionGroup as e:
+        return e
+
+
+def main():
+    group = build_group()
+    start = time.perf_counter()
+    te = traceback.TracebackException.from_exception(group)
+    te.exceptions
+    captured = time.perf_counter()
+    lines = sum(1 for _ in te.format())
+    formatted = time.perf_counter()
+    print(
+        "{} children: capture {:.3f} s, format {:.3f} s ({} lines)".format(
+            CHILDREN, captured - start, formatted - captured, lines
+        )
+    )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,187 @@
+"""Measurement, reporting and baselines for the benchmark suite in
+bench_suite.py.
+
+    python -m pytest benchmarks --bench-save=baseline.json
+    ... change things ...
+    python -m pytest benchmarks --bench-compare=baseline.json
+
+With ``--bench-compare``, a benchmark fails if it got slower, or its memory
+peak grew, by more than ``--bench-threshold`` (a fraction) relative to the
+baseline.  Timings from different runs are only comparable on a quiet
+machine; on a noisy one, raise ``--bench-time`` or the threshold.
+"""
+
+import gc
+import json
+import platform
+import sys
+import time
+import tracemalloc
+from collections import OrderedDict
+
+import pytest
+
+# Peaks this close to the baseline are never regressions, however small the
+# baseline is.
+PEAK_SLACK_BYTES = 1024
+
+results = OrderedDict()
+
+
+def pytest_addoption(parser):
+    group = parser.getgroup("benchmarks")
+    group.addoption(
+        "--bench-save",
+        metavar="PATH",
+        help="write the results to PATH as a JSON baseline",
+    )
+    group.addoption(
+        "--bench-compare",
+        metavar="PATH",
+        help="fail benchmarks that regressed relative to the baseline at PATH",
+    )
+    group.addoption(
+        "--bench-threshold",
+        type=float,
+        default=0.25,
+        help="allowed regression, as a fraction (default: 0.25)",
+    )
+    group.addoption(
+        "--bench-time",
+        type=float,
+        default=0.2,
+        help="seconds to spend on each timing round (default: 0.2)",
+    )
+
+
+def ops_per_sec(fn, min_time, rounds=3):
+    """Calls per second of `fn`, from the best of `rounds` timing rounds that
+    each last at least `min_time` seconds.
+
+    Like :mod:`timeit`, this keeps the garbage collector off while timing.
+    """
+    gc_was_enabled = gc.isenabled()
+    gc.disable()
+    try:
+        return _ops_per_sec(fn, min_time, rounds)
+    finally:
+        if gc_was_enabled:
+            gc.enable()
+
+
+def _ops_per_sec(fn, min_time, rounds):
+    number = 1
+    while True:
+        start = time.perf_counter()
+        for _ in range(number):
+            fn()
+        elapsed = time.perf_counter() - start
+        if elapsed >= min_time:
+            break
+        number *= 2
+    best = elapsed
+    for _ in range(rounds - 1):
+        start = time.perf_counter()
+        for _ in range(number):
+            fn()
+        best = min(best, time.perf_counter() - start)
+    return number / best
+
+
+def peak_bytes(fn):
+    """The peak of memory allocated while calling `fn` once."""
+    tracemalloc.start()
+    try:
+        fn()
+        return tracemalloc.get_traced_memory()[1]
+    finally:
+        tracemalloc.stop()
+
+
+def load_baseline(config):
+    path = config.getoption("bench_compare")
+    if path is None:
+        return None
+    if not hasattr(config, "_bench_baseline"):
+        with open(path) as file:
+            config._bench_baseline = json.load(file)["results"]
+    return config._bench_baseline
+
+
+def regressions(result, base, threshold):
+    problems = []
+    if result["ops_per_sec"] < base["ops_per_sec"] * (1 - threshold):
+        problems.append(
+            "{:.0f} ops/sec, down from {:.0f}".format(
+                result["ops_per_sec"], base["ops_per_sec"]
+            )
+        )
+    allowed_peak = base["peak_bytes"] * (1 + threshold) + PEAK_SLACK_BYTES
+    if result["peak_bytes"] > allowed_peak:
+        problems.append(
+            "peak of {} bytes, up from {}".format(
+                result["peak_bytes"], base["peak_bytes"]
+            )
+        )
+    return problems
+
+
+@pytest.fixture
+def benchmark(request):
+    """Measure a callable, record the result under the test's id, and
+    compare it with the baseline if there is one.
+    """
+    config = request.config
+
+    def run(fn):
+        name = request.node.name
+        # Memory first, so that any caches are warm for the timing.
+        result = OrderedDict()
+        result["peak_bytes"] = peak_bytes(fn)
+        result["ops_per_sec"] = ops_per_sec(fn, config.getoption("bench_time"))
+        results[name] = result
+        baseline = load_baseline(config)
+        if baseline is not None and name in baseline:
+            problems = regressions(
+                result, baseline[name], config.getoption("bench_threshold")
+            )
+            if problems:
+                pytest.fail(
+                    "{} regressed: {}".format(name, "; ".join(problems))
+                )
+        return result
+
+    return run
+
+
+def pytest_terminal_summary(terminalreporter):
+    if not results:
+        return
+    terminalreporter.section("benchmarks")
+    terminalreporter.write_line(
+        "{:<40} {:>14} {:>14}".format("benchmark", "ops/sec", "peak bytes")
+    )
+    for name, result in results.items():
+        terminalreporter.write_line(
+            "{:<40} {:>14.1f} {:>14}".format(
+                name, result["ops_per_sec"], result["peak_bytes"]
+            )
+        )
+
+
+def pytest_sessionfinish(session):
+    path = session.config.getoption("bench_save", None)
+    if path is None or not results:
+        return
+    with open(path, "w") as file:
+        json.dump(
+            OrderedDict(
+                [
+                    ("python", sys.version),
+                    ("platform", platform.platform()),
+                    ("results", results),
+                ]
+            ),
+            file,
+            indent=2,
+        )
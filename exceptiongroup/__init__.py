@@ -1,8 +1,43 @@
 """Top-level package for exceptiongroup."""
 
+import sys
+
 from ._version import __version__
 
-__all__ = ["ExceptionGroup", "split", "catch"]
+__all__ = [
+    "ExceptionGroup",
+    "AggregatedSources",
+    "ExceptionGroupCollector",
+    "split",
+    "partition",
+    "catch",
+    "open_handler",
+    "set_split_cache",
+    "iter_leaves",
+    "contains",
+    "find_first",
+    "count_by_type",
+    "install",
+    "uninstall",
+    "set_traceback_limits",
+    "print_exception_group",
+    "export_events",
+    "export_tree",
+    "export_json_lines",
+    "add_instrumentation_hook",
+    "remove_instrumentation_hook",
+    "InstrumentationCounters",
+    "TaskGroup",
+    "gather_group",
+    "acatch",
+    "run_all",
+    "as_completed_group",
+]
+
+
+# The descriptor behind BaseException.args, which ExceptionGroup wraps.
+_get_args = BaseException.args.__get__
+_set_args = BaseException.args.__set__
 
 
 class ExceptionGroup(BaseException):
@@ -13,9 +48,12 @@ class ExceptionGroup(BaseException):
 
     Args:
       message (str): A description of the overall exception.
-      exceptions (list): The exceptions.
-      sources (list): For each exception, a string describing where it came
-        from.
+      exceptions (iterable): The exceptions.
+      sources (iterable): For each exception, a string describing where it
+        came from.
+      intern_sources (bool): If true, string sources are interned with
+        :func:`sys.intern`, so that equal descriptions repeated across many
+        exceptions (e.g. ``"worker task"``) are stored only once.
 
     Raises:
       TypeError: if any of the passed in objects are not instances of
@@ -25,28 +63,102 @@ class ExceptionGroup(BaseException):
 
     """
 
-    def __init__(self, message, exceptions, sources):
-        super().__init__(message, exceptions, sources)
-        self.exceptions = list(exceptions)
-        for exc in self.exceptions:
+    # The message, exceptions and sources are only stored in ``args``, and the
+    # attributes below are views onto it.  With no instance attributes of our
+    # own, groups never need a ``__dict__``.  The exceptions and sources are
+    # tuples, so they can only change by being replaced, through the setters
+    # below or by assigning ``args``, which keep track of it.  _leaf_index
+    # caches a summary of the leaves, see _query.leaf_index.
+    __slots__ = ("__weakref__", "_leaf_index")
+
+    # Bumped whenever the exceptions of any group are replaced, which makes
+    # every cached _leaf_index stale: the group may be nested in others.
+    _exceptions_generation = 0
+
+    def __init__(self, message, exceptions, sources, *, intern_sources=False):
+        if _monkeypatch.auto_install:
+            _monkeypatch.install_automatically()
+        exceptions = tuple(exceptions)
+        for exc in exceptions:
             if not isinstance(exc, BaseException):
                 raise TypeError(
                     "Expected an exception object, not {!r}".format(exc)
                 )
-        self.message = message
-        self.sources = list(sources)
-        if len(self.sources) != len(self.exceptions):
+        if intern_sources:
+            sources = tuple(
+                sys.intern(source) if type(source) is str else source
+                for source in sources
+            )
+        else:
+            sources = tuple(sources)
+        if len(sources) != len(exceptions):
             raise ValueError(
                 "different number of sources ({}) and exceptions ({})".format(
-                    len(self.sources), len(self.exceptions)
+                    len(sources), len(exceptions)
                 )
             )
+        super().__init__(message, exceptions, sources)
 
-    # copy.copy doesn't work for ExceptionGroup, because BaseException have
-    # rewrite __reduce_ex__ method.  We need to add __copy__ method to
-    # make it can be copied.
-    def __copy__(self):
-        new_group = self.__class__(self.message, self.exceptions, self.sources)
+    @classmethod
+    def _from_validated(cls, message, exceptions, sources):
+        """Create a group from sequences that are already known to be valid.
+
+        Unlike the regular constructor, this doesn't check `exceptions` and
+        `sources`, it only turns them into tuples (which doesn't copy them
+        if they already are).
+
+        """
+        if _monkeypatch.auto_install:
+            _monkeypatch.install_automatically()
+        return cls.__new__(cls, message, tuple(exceptions), tuple(sources))
+
+    @property
+    def args(self):
+        return _get_args(self)
+
+    @args.setter
+    def args(self, args):
+        # This may replace the exceptions as well.
+        _set_args(self, args)
+        ExceptionGroup._exceptions_generation += 1
+
+    @property
+    def message(self):
+        return _get_args(self)[0]
+
+    @message.setter
+    def message(self, message):
+        _set_args(self, (message,) + _get_args(self)[1:])
+
+    @property
+    def exceptions(self):
+        return _get_args(self)[1]
+
+    @exceptions.setter
+    def exceptions(self, exceptions):
+        args = _get_args(self)
+        self.args = (args[0], tuple(exceptions), args[2])
+
+    @property
+    def sources(self):
+        return _get_args(self)[2]
+
+    @sources.setter
+    def sources(self, sources):
+        _set_args(self, _get_args(self)[:2] + (tuple(sources),))
+
+    def _derive(self, exceptions, sources):
+        """Copy this group, but with the given (valid) children.
+
+        The copy keeps the message, ``__traceback__``, ``__cause__`` and
+        ``__context__`` of this group, and the instance attributes of
+        subclasses, which get no chance to set them in ``__init__``.
+
+        """
+        new_group = self._from_validated(self.message, exceptions, sources)
+        state = getattr(self, "__dict__", None)
+        if state:
+            new_group.__dict__.update(state)
         new_group.__traceback__ = self.__traceback__
         new_group.__context__ = self.__context__
         new_group.__cause__ = self.__cause__
@@ -56,6 +168,51 @@ class ExceptionGroup(BaseException):
         new_group.__suppress_context__ = self.__suppress_context__
         return new_group
 
+    # copy.copy doesn't work for ExceptionGroup, because BaseException have
+    # rewrite __reduce_ex__ method.  We need to add __copy__ method to
+    # make it can be copied.
+    def __copy__(self):
+        return self._derive(self.exceptions, self.sources)
+
+    def __reduce__(self):
+        # Unlike the default reduction of exceptions, this keeps tracebacks
+        # (as frame summaries), __cause__ and __context__ throughout the
+        # tree, and encodes shared exceptions only once.
+        return _pickling.reduce_group(self)
+
+    def aggregate(self):
+        """Fold identical exceptions together.
+
+        Leaves of the same group that have the same type and args, and were
+        raised from the same place, are replaced by the first of them.  Its
+        source becomes an :class:`AggregatedSources` listing the sources of
+        all the folded exceptions.  Nested groups are aggregated too, but
+        leaves are never moved between groups.
+
+        Returns:
+          A new group, or this group if there was nothing to fold.
+
+        """
+        return _aggregate.aggregate(self)
+
+    def compact(self):
+        """Replace the tracebacks in this group with frame summaries.
+
+        The tracebacks of the group, of every exception in it, and of their
+        causes and contexts are each replaced by a summary of their frames,
+        and the frames themselves are released, along with their local
+        variables.  The exceptions still format and export the same way,
+        so this suits groups that are kept around for a long time.
+
+        This changes the exceptions in place.
+
+        Returns:
+          This group.
+
+        """
+        _compact.compact(self)
+        return self
+
     def __str__(self):
         return ", ".join(repr(exc) for exc in self.exceptions)
 
@@ -63,5 +220,25 @@ class ExceptionGroup(BaseException):
         return "<ExceptionGroup: {}>".format(self)
 
 
+from ._instrument import (
+    add_instrumentation_hook,
+    remove_instrumentation_hook,
+    InstrumentationCounters,
+)
 from . import _monkeypatch
-from ._tools import split, catch
+from ._monkeypatch import (
+    install,
+    uninstall,
+    set_traceback_limits,
+    print_exception_group,
+)
+from . import _aggregate
+from ._aggregate import AggregatedSources
+from . import _pickling
+from . import _compact
+from ._tools import split, partition, catch, open_handler, set_split_cache
+from ._query import iter_leaves, contains, find_first, count_by_type
+from ._collector import ExceptionGroupCollector
+from ._export import export_events, export_tree, export_json_lines
+from ._asyncio import TaskGroup, gather_group, acatch
+from ._futures import run_all, as_completed_group
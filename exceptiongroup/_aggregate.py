@@ -0,0 +1,163 @@
+################################################################
+# Folding identical exceptions in an ExceptionGroup
+#
+# When a shared dependency dies, a group can hold thousands of leaves that
+# differ only in where they came from.  Folding them into one representative
+# exception, whose source lists every original source, makes everything that
+# walks the tree (split, catch, formatting, pickling) scale with the number
+# of distinct failures instead.
+################################################################
+
+from . import ExceptionGroup
+from ._pickling import SUMMARY_ATTR
+
+
+class AggregatedSources(tuple):
+    """The sources of several identical exceptions that were folded into a
+    single representative by :meth:`ExceptionGroup.aggregate`.
+
+    It takes the place of the representative's entry in the group's
+    ``sources``, so it follows the representative through :func:`split` and
+    :func:`catch` like any other source.
+    """
+
+    __slots__ = ()
+
+    # How many sources str() spells out before summarizing the rest.
+    shown = 3
+
+    @property
+    def count(self):
+        """The number of exceptions that were folded together."""
+        return len(self)
+
+    def __str__(self):
+        shown = ", ".join(str(source) for source in self[: self.shown])
+        if len(self) > self.shown:
+            shown += ", ... ({} more)".format(len(self) - self.shown)
+        return "{} identical exceptions from {}".format(len(self), shown)
+
+
+def aggregate(group):
+    """Implementation of :meth:`ExceptionGroup.aggregate`."""
+    stack = [_AggregateFrame(group, None)]
+    while True:
+        frame = stack[-1]
+        for exc, source in frame.children:
+            if isinstance(exc, ExceptionGroup):
+                stack.append(_AggregateFrame(exc, source))
+                break
+            frame.folder.add(exc, source, _aggregation_key(exc))
+        else:
+            stack.pop()
+            if frame.folder.folded:
+                result = frame.group._derive(*frame.folder.results())
+            else:
+                result = frame.group
+            if not stack:
+                return result
+            parent = stack[-1]
+            parent.folder.add(result, frame.source, None)
+            if result is not frame.group:
+                parent.folder.folded = True
+
+
+class _AggregateFrame:
+    __slots__ = ("group", "source", "children", "folder")
+
+    def __init__(self, group, source):
+        self.group = group
+        self.source = source
+        self.children = iter(zip(group.exceptions, group.sources))
+        self.folder = _Folder()
+
+
+class _Folder:
+    """Accumulates the children of one group, folding identical leaves.
+
+    Leaves are identified by the key from :func:`_aggregation_key`; a None
+    key means the exception is never folded.
+    """
+
+    __slots__ = ("exceptions", "sources", "index", "extra_sources", "folded")
+
+    def __init__(self):
+        self.exceptions = []
+        self.sources = []
+        # Maps aggregation key -> index of the representative
+        self.index = {}
+        # Maps index of a representative -> list of all its sources, for the
+        # representatives that had something folded into them
+        self.extra_sources = {}
+        # Whether the results differ from the children as they were added
+        self.folded = False
+
+    def add(self, exc, source, key):
+        if key is not None:
+            try:
+                i = self.index[key]
+            except KeyError:
+                self.index[key] = len(self.exceptions)
+            else:
+                try:
+                    all_sources = self.extra_sources[i]
+                except KeyError:
+                    all_sources = self.extra_sources[i] = list(
+                        _as_sources(self.sources[i])
+                    )
+                all_sources.extend(_as_sources(source))
+                self.folded = True
+                return
+        self.exceptions.append(exc)
+        self.sources.append(source)
+
+    def results(self):
+        """Returns the lists of exceptions and of sources, after folding."""
+        for i, all_sources in self.extra_sources.items():
+            self.sources[i] = AggregatedSources(all_sources)
+        self.extra_sources = {}
+        return self.exceptions, self.sources
+
+
+def _as_sources(source):
+    if isinstance(source, AggregatedSources):
+        return source
+    return (source,)
+
+
+def _aggregation_key(exc):
+    """Returns a key that is equal for exceptions that can be folded
+    together, or None if `exc` must not be folded.
+
+    Exceptions are considered identical if they have the same type and args,
+    were raised along the same traceback, and so were their ``__cause__`` and
+    ``__context__``.
+    """
+    if isinstance(exc, ExceptionGroup):
+        return None
+    key = (
+        _exception_key(exc),
+        _exception_key(exc.__cause__),
+        _exception_key(exc.__context__),
+    )
+    try:
+        hash(key)
+    except TypeError:
+        return None
+    return key
+
+
+def _exception_key(exc):
+    if exc is None:
+        return None
+    sites = []
+    tb = exc.__traceback__
+    if tb is None:
+        # A compacted or unpickled exception may have a summary instead.
+        summary = getattr(exc, SUMMARY_ATTR, None)
+        if summary is not None:
+            sites = [frame[:3] for frame in summary]
+    while tb is not None:
+        sites.append((tb.tb_frame.f_code, tb.tb_lineno))
+        tb = tb.tb_next
+    return type(exc), exc.args, tuple(sites)
@@ -0,0 +1,264 @@
+################################################################
+# asyncio support: task groups and an async version of catch()
+################################################################
+
+from time import perf_counter
+
+# asyncio is only imported once it's needed, since it is slow to import and
+# by then it has almost always been imported already anyway.
+
+from ._collector import ExceptionGroupCollector
+from ._instrument import hooks
+from ._tools import Catcher
+
+
+class TaskGroup:
+    """An async context manager that runs tasks concurrently and raises an
+    :class:`ExceptionGroup` of everything they raised.
+
+    Tasks are started with :meth:`create_task`, from the body of the
+    ``async with`` block or from the tasks themselves.  Leaving the block
+    waits for all of them.  The source of each exception in the group is the
+    name of the task that raised it, in the order the tasks finished.  If the
+    body of the block itself raises, that exception joins the group with the
+    source ``"task group body"``.
+
+    Tasks that end up cancelled are not reported.  If the task running the
+    block is cancelled while it waits, the remaining tasks are cancelled too
+    and the cancellation propagates instead of a group.
+
+    Args:
+      message (str): The message of the raised group.
+      fail_fast (bool): If true, the first failure cancels every task that is
+        still running, and the body of the block if it hasn't finished yet.
+        Otherwise all tasks run to completion and every failure is
+        collected.
+
+    Example:
+        async with TaskGroup() as tg:
+            for url in urls:
+                tg.create_task(fetch(url), name=url)
+    """
+
+    def __init__(self, message="errors in task group", *, fail_fast=False):
+        self._fail_fast = fail_fast
+        self._collector = ExceptionGroupCollector(message)
+        self._tasks = []
+        self._pending = set()
+        # The task running the block, and whether the block has been left
+        self._parent_task = None
+        self._exiting = False
+        # Whether we cancelled the parent task, and haven't seen the
+        # resulting CancelledError yet
+        self._parent_cancelling = False
+
+    async def __aenter__(self):
+        import asyncio
+
+        current_task = getattr(asyncio, "current_task", None)
+        if current_task is None:
+            # Python < 3.7
+            current_task = asyncio.Task.current_task
+        self._parent_task = current_task()
+        return self
+
+    def create_task(self, coro, *, name=None):
+        """Start running `coro` as a task of this group, and return the task.
+
+        Args:
+          coro: A coroutine, or any awaitable.
+          name (str or None): The source of the task's exception in the
+            group.  Defaults to the task's own name on Python 3.8+, or to
+            ``"task N"`` before that.
+        """
+        import asyncio
+
+        task = asyncio.ensure_future(coro)
+        if name is None:
+            get_name = getattr(task, "get_name", None)
+            if get_name is not None:
+                name = get_name()
+            else:
+                name = "task {}".format(len(self._tasks))
+        elif hasattr(task, "set_name"):
+            task.set_name(name)
+        self._tasks.append(task)
+        self._pending.add(task)
+        task.add_done_callback(lambda task: self._task_done(task, name))
+        return task
+
+    @property
+    def tasks(self):
+        """The tasks started so far, in the order they were started."""
+        return list(self._tasks)
+
+    def _task_done(self, task, name):
+        self._pending.discard(task)
+        if task.cancelled():
+            return
+        exc = task.exception()
+        if exc is not None:
+            self._failed(exc, name)
+
+    def _failed(self, exc, source):
+        self._collector.add(exc, source)
+        if self._fail_fast:
+            self._cancel_pending()
+            if (
+                not self._exiting
+                and not self._parent_cancelling
+                and self._parent_task is not None
+            ):
+                self._parent_cancelling = True
+                self._parent_task.cancel()
+
+    def _cancel_pending(self):
+        for task in self._pending:
+            task.cancel()
+
+    def _parent_cancelled(self):
+        """Forget that we cancelled the parent task, and return whether it
+        was cancelled by something else as well, as far as we can tell.
+        """
+        self._parent_cancelling = False
+        # Python 3.11+ counts cancellation requests
+        uncancel = getattr(self._parent_task, "uncancel", None)
+        return uncancel is not None and uncancel() > 0
+
+    async def __aexit__(self, etype, exc, tb):
+        import asyncio
+
+        self._exiting = True
+        cancelled = isinstance(exc, asyncio.CancelledError)
+        if cancelled and self._parent_cancelling:
+            # We cancelled the body ourselves, to fail fast, and the group is
+            # raised instead.
+            cancelled = self._parent_cancelled()
+            if not cancelled:
+                exc = None
+        if cancelled:
+            self._cancel_pending()
+        elif exc is not None:
+            self._failed(exc, "task group body")
+        # Tasks may start more tasks while we wait, so loop until none are
+        # left.
+        while self._pending:
+            try:
+                await asyncio.wait(list(self._pending))
+            except asyncio.CancelledError:
+                cancelled = True
+                self._cancel_pending()
+        if self._parent_cancelling:
+            # The body caught our cancellation.
+            self._parent_cancelled()
+        if cancelled:
+            if exc is None:
+                raise asyncio.CancelledError
+            return False
+        group = self._collector.build()
+        if group is None:
+            return False
+        # Don't let the body's exception, which is already in the group,
+        # also become its __context__.
+        saved_context = group.__context__
+        try:
+            raise group
+        finally:
+            group.__context__ = saved_context
+
+
+async def gather_group(*aws, names=None, fail_fast=False):
+    """Run awaitables concurrently and return their results as a list.
+
+    Like :func:`asyncio.gather`, but if any of them fail, an
+    :class:`ExceptionGroup` of all the failures is raised instead, as with
+    :class:`TaskGroup`.
+
+    Args:
+      *aws: The coroutines or other awaitables to run.
+      names (iterable or None): The source to use for each awaitable.
+      fail_fast (bool): Whether the first failure cancels the others.
+    """
+    if names is None:
+        names = [None] * len(aws)
+    else:
+        names = list(names)
+        if len(names) != len(aws):
+            raise ValueError("names must be the same length as aws")
+    async with TaskGroup(fail_fast=fail_fast) as tg:
+        tasks = [tg.create_task(aw, name=n) for aw, n in zip(aws, names)]
+    return [task.result() for task in tasks]
+
+
+class AsyncCatcher(Catcher):
+    """The ``async with`` counterpart of the context manager returned by
+    :func:`catch`.  The handler may be a plain function or a coroutine
+    function.
+    """
+
+    async def __aenter__(self):
+        pass
+
+    async def __aexit__(self, etype, exc, tb):
+        __traceback_hide__ = True  # for pytest
+        if exc is None:
+            return False
+        start = perf_counter() if hooks else None
+        caught, rest = self._split(exc)
+        if caught is None:
+            if start is not None:
+                self._report(exc, start, handled=False)
+            return False
+        handler_exc = await _run_async_handler(
+            self._handler, caught, handling=caught is exc
+        )
+        if start is not None:
+            self._report(exc, start, handled=True)
+        if handler_exc is caught:
+            return False
+        exceptiongroup_catch_exc = self._remains(handler_exc, rest)
+        if exceptiongroup_catch_exc is None:
+            return True
+
+        # See Catcher.__exit__
+        saved_context = exceptiongroup_catch_exc.__context__
+        try:
+            raise exceptiongroup_catch_exc
+        finally:
+            exceptiongroup_catch_exc.__context__ = saved_context
+
+
+async def _run_async_handler(handler, caught, handling=False):
+    """Like :func:`_run_handler`, but awaits the handler's result if it is
+    awaitable.
+    """
+    __traceback_hide__ = True  # for pytest
+    from inspect import isawaitable
+
+    saved_caught_context = caught.__context__
+    saved_caught_traceback = caught.__traceback__
+    try:
+        if handling:
+            result = handler(caught)
+            if isawaitable(result):
+                await result
+        else:
+            try:
+                raise caught
+            except type(caught):
+                result = handler(caught)
+                if isawaitable(result):
+                    await result
+    except BaseException as handler_exc:
+        return handler_exc
+    finally:
+        caught.__context__ = saved_caught_context
+        caught.__traceback__ = saved_caught_traceback
+    return None
+
+
+def acatch(exc_type, handler, match=None):
+    """Like :func:`catch`, but for use with ``async with``, and the handler
+    may be a coroutine function.
+    """
+    return AsyncCatcher(exc_type, handler, match)
@@ -0,0 +1,129 @@
+################################################################
+# Collecting exceptions from many threads into one ExceptionGroup
+################################################################
+
+import sys
+import threading
+
+from . import ExceptionGroup
+from . import _compact
+from ._aggregate import _Folder, _aggregation_key
+
+
+class ExceptionGroupCollector:
+    """Gathers exceptions, possibly from many threads at once, into a single
+    :class:`ExceptionGroup`.
+
+    Each call to :meth:`add` holds an internal lock only long enough to append
+    to two lists, so concurrent workers barely contend with each other.  To
+    keep a storm of failures from exhausting memory, at most `max_exceptions`
+    exceptions are retained; any further ones are only counted.
+
+    Args:
+      message (str): The message of the built group.
+      max_exceptions (int or None): How many exceptions to retain, or None
+        for no limit.
+      intern_sources (bool): If true, string sources are interned with
+        :func:`sys.intern`, like the ``intern_sources`` argument of
+        :class:`ExceptionGroup`.
+      aggregate (bool): If true, identical exceptions are folded together as
+        they are added, like with :meth:`ExceptionGroup.aggregate`.  Folded
+        exceptions don't count towards `max_exceptions`.
+      compact (bool): If true, the tracebacks of exceptions are replaced
+        with frame summaries as they are added, like with
+        :meth:`ExceptionGroup.compact`, so that the collector doesn't keep
+        their frames alive.
+
+    Example:
+        collector = ExceptionGroupCollector("worker failures", 10000)
+
+        def worker(item):
+            try:
+                process(item)
+            except Exception as exc:
+                collector.add(exc, "item {}".format(item))
+
+        ... # run the workers
+
+        group = collector.build()
+        if group is not None:
+            raise group
+    """
+
+    def __init__(
+        self,
+        message,
+        max_exceptions=None,
+        *,
+        intern_sources=False,
+        aggregate=False,
+        compact=False
+    ):
+        if max_exceptions is not None and max_exceptions < 0:
+            raise ValueError("max_exceptions must be None or non-negative")
+        self._message = message
+        self._max_exceptions = max_exceptions
+        self._intern_sources = intern_sources
+        self._aggregate = aggregate
+        self._compact = compact
+        self._lock = threading.Lock()
+        self._folder = _Folder()
+        self._dropped = 0
+
+    def add(self, exc, source):
+        """Record `exc`, which came from `source`.
+
+        Raises:
+          TypeError: if `exc` is not an instance of :exc:`BaseException`.
+        """
+        if not isinstance(exc, BaseException):
+            raise TypeError(
+                "Expected an exception object, not {!r}".format(exc)
+            )
+        if self._compact:
+            _compact.compact(exc)
+        if self._intern_sources and type(source) is str:
+            source = sys.intern(source)
+        key = _aggregation_key(exc) if self._aggregate else None
+        with self._lock:
+            folder = self._folder
+            if (
+                self._max_exceptions is not None
+                and len(folder.exceptions) >= self._max_exceptions
+                and (key is None or key not in folder.index)
+            ):
+                self._dropped += 1
+            else:
+                folder.add(exc, source, key)
+
+    def __len__(self):
+        """The number of exceptions retained so far."""
+        return len(self._folder.exceptions)
+
+    @property
+    def dropped(self):
+        """The number of exceptions that were added after the collector was
+        full, and so not retained.
+        """
+        return self._dropped
+
+    def build(self):
+        """Return an :class:`ExceptionGroup` of everything collected so far,
+        or None if nothing was.
+
+        The exceptions are not checked again on the way into the group, and
+        the collector starts over empty.  If exceptions were dropped, the
+        group's message says how many.
+        """
+        with self._lock:
+            folder, self._folder = self._folder, _Folder()
+            dropped, self._dropped = self._dropped, 0
+        exceptions, sources = folder.results()
+        if not exceptions and not dropped:
+            return None
+        message = self._message
+        if dropped:
+            message = "{} ({} more exceptions were dropped)".format(
+                message, dropped
+            )
+        return ExceptionGroup._from_validated(message, exceptions, sources)
@@ -0,0 +1,31 @@
+################################################################
+# Replacing live tracebacks with frame summaries
+################################################################
+
+from ._pickling import SUMMARY_ATTR, traceback_summary
+from . import ExceptionGroup
+
+
+def compact(exc):
+    """Implements :meth:`ExceptionGroup.compact`, for any exception `exc`.
+
+    Every exception reachable from `exc` through the children of groups,
+    ``__cause__`` and ``__context__`` is visited once.
+    """
+    seen = set()
+    # Holds the visited exceptions, so that their ids stay unique.
+    visited = []
+    stack = [exc]
+    while stack:
+        current = stack.pop()
+        if current is None or id(current) in seen:
+            continue
+        seen.add(id(current))
+        visited.append(current)
+        if current.__traceback__ is not None:
+            setattr(current, SUMMARY_ATTR, traceback_summary(current))
+            current.__traceback__ = None
+        stack.append(current.__cause__)
+        stack.append(current.__context__)
+        if isinstance(current, ExceptionGroup):
+            stack.extend(current.exceptions)
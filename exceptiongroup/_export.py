@@ -0,0 +1,167 @@
+################################################################
+# Structured export of exceptions and ExceptionGroups
+#
+# An alternative to parsing formatted tracebacks: the tree of exceptions is
+# walked once, and every exception is described by a JSON-serializable dict.
+################################################################
+
+import json
+import traceback
+from collections import OrderedDict
+
+from . import ExceptionGroup
+from ._aggregate import AggregatedSources
+from ._pickling import summary_stack
+
+
+def export_events(exc, *, limit=None, lookup_lines=True):
+    """Describe `exc`, and every exception reachable from it, as a stream of
+    JSON-serializable events.
+
+    Each distinct exception yields exactly one event, a dict with:
+
+    * ``"id"``: an integer identifying the exception, 0 for `exc` itself.
+    * ``"type"``: the qualified name of its class, as in a traceback.
+    * ``"message"``: its message (``str()``, or ``message`` for groups).
+    * ``"frames"``: a list of ``{"filename", "lineno", "name", "line"}``
+      dicts for its traceback, outermost first.
+    * ``"cause"`` and ``"context"``: the id of its ``__cause__`` and
+      ``__context__``, or None.
+    * ``"suppress_context"``: its ``__suppress_context__``.
+    * ``"exceptions"``: only for an ExceptionGroup, a list of
+      ``{"id", "source"}`` dicts for its children.  A source is a string,
+      or a list of strings for :class:`AggregatedSources`.
+
+    An exception that can be reached several ways (say, a child shared by two
+    groups) is referred to by the same id each time, but described only once.
+    Events come in depth-first order, with an exception's event before those
+    of the exceptions it refers to, unless it refers to them again.
+
+    Args:
+      exc (BaseException): The exception to describe.
+      limit (int or None): The most frames to include per traceback, like
+        the ``limit`` argument of :mod:`traceback` functions.
+      lookup_lines (bool): Whether to read the source ``line`` of each frame;
+        if false it is None.
+    """
+    ids = {id(exc): 0}
+    # Keep every exception visited alive, so its id can't be reused by
+    # another exception created while the generator is suspended.
+    visited = [exc]
+    stack = [exc]
+    while stack:
+        current = stack.pop()
+        discovered = []
+
+        def ref(linked):
+            if linked is None:
+                return None
+            try:
+                return ids[id(linked)]
+            except KeyError:
+                ids[id(linked)] = len(visited)
+                visited.append(linked)
+                discovered.append(linked)
+                return ids[id(linked)]
+
+        event = {
+            "id": ids[id(current)],
+            "type": _type_name(type(current)),
+            "message": _message(current),
+            "frames": _frames(current, limit, lookup_lines),
+            "cause": ref(current.__cause__),
+            "context": ref(current.__context__),
+            "suppress_context": current.__suppress_context__,
+        }
+        if isinstance(current, ExceptionGroup):
+            event["exceptions"] = [
+                {"id": ref(child), "source": _source(source)}
+                for child, source in zip(current.exceptions, current.sources)
+            ]
+        yield event
+        stack.extend(reversed(discovered))
+
+
+def export_tree(exc, **kwargs):
+    """Describe `exc` as a single nested dict.
+
+    The nodes are the events of :func:`export_events` (which takes the same
+    keyword arguments), with the ids of the ``cause``, ``context`` and
+    children replaced by the nodes themselves.  An exception that was already
+    placed elsewhere in the tree is replaced by ``{"ref": id}`` instead.
+    """
+    nodes = OrderedDict()
+    for event in export_events(exc, **kwargs):
+        nodes[event["id"]] = event
+    placed = {0}
+
+    def place(node_id):
+        if node_id is None:
+            return None
+        if node_id in placed:
+            return {"ref": node_id}
+        placed.add(node_id)
+        return nodes[node_id]
+
+    # Every exception's event comes after the event of the exception that
+    # first referred to it, so going through them in order places each node
+    # where it was first referred to.
+    for node in nodes.values():
+        node["cause"] = place(node["cause"])
+        node["context"] = place(node["context"])
+        for child in node.get("exceptions", ()):
+            child["exception"] = place(child.pop("id"))
+    return nodes[0]
+
+
+def export_json_lines(exc, file, **kwargs):
+    """Write the events of :func:`export_events` (which takes the same
+    keyword arguments) to `file`, as one line of JSON each.
+    """
+    for event in export_events(exc, **kwargs):
+        file.write(json.dumps(event))
+        file.write("\n")
+
+
+def _type_name(exc_type):
+    module = exc_type.__module__
+    qualname = exc_type.__qualname__
+    if module in ("__main__", "builtins"):
+        return qualname
+    return "{}.{}".format(module, qualname)
+
+
+def _message(exc):
+    if isinstance(exc, ExceptionGroup):
+        return str(exc.message)
+    try:
+        return str(exc)
+    except Exception:
+        return "<exception str() failed>"
+
+
+def _source(source):
+    if isinstance(source, AggregatedSources):
+        return [str(item) for item in source]
+    return str(source)
+
+
+def _frames(exc, limit, lookup_lines):
+    stack = None
+    if exc.__traceback__ is None:
+        stack = summary_stack(exc, limit)
+    if stack is None:
+        stack = traceback.StackSummary.extract(
+            traceback.walk_tb(exc.__traceback__),
+            limit=limit,
+            lookup_lines=lookup_lines,
+        )
+    return [
+        {
+            "filename": frame.filename,
+            "lineno": frame.lineno,
+            "name": frame.name,
+            "line": frame.line if lookup_lines else None,
+        }
+        for frame in stack
+    ]
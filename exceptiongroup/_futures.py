@@ -0,0 +1,181 @@
+################################################################
+# concurrent.futures support: collecting failures from executors
+################################################################
+
+import itertools
+import os
+
+# concurrent.futures is only imported once it's needed, since it is slow to
+# import.
+
+from ._collector import ExceptionGroupCollector
+
+
+def run_all(
+    executor,
+    fn,
+    iterable,
+    *,
+    chunksize=1,
+    max_in_flight=None,
+    describe=repr,
+    message="errors in run_all"
+):
+    """Call ``fn(item)`` on `executor` for each item of `iterable`, and
+    generate ``(item, result)`` pairs as the calls finish.
+
+    Failed calls don't stop the others.  Once everything has run, an
+    :class:`ExceptionGroup` of all the failures is raised, with
+    ``describe(item)`` as the source of each.
+
+    Items are taken from `iterable` only as capacity frees up, so it may be
+    large or infinite.  This works with both thread and process pools; with a
+    process pool, `fn` and the items must be picklable.
+
+    Args:
+      executor (concurrent.futures.Executor): Where to run the calls.
+      fn: The function to call on each item.
+      iterable: The items.
+      chunksize (int): How many items to send to the executor in each
+        submission.  Larger chunks cut the per-submission overhead of
+        process pools.
+      max_in_flight (int or None): How many submissions may be pending at
+        once.  Defaults to twice the number of workers of the executor.
+      describe: Turns a failed item into its source in the group.
+      message (str): The message of the raised group.
+
+    Raises:
+      ValueError: Straight away, rather than on the first ``next()``, if
+        `chunksize` or `max_in_flight` is less than 1.
+    """
+    if chunksize < 1:
+        raise ValueError("chunksize must be at least 1")
+    if max_in_flight is None:
+        # Both standard executors keep their size here; fall back to the
+        # number of CPUs for anything else.
+        workers = getattr(executor, "_max_workers", None)
+        max_in_flight = 2 * (workers or os.cpu_count() or 1)
+    elif max_in_flight < 1:
+        raise ValueError("max_in_flight must be at least 1")
+    return _run_all(
+        executor, fn, iterable, chunksize, max_in_flight, describe, message
+    )
+
+
+def _run_all(
+    executor, fn, iterable, chunksize, max_in_flight, describe, message
+):
+    """The generator behind :func:`run_all`, with its arguments checked."""
+    import concurrent.futures
+
+    collector = ExceptionGroupCollector(message)
+    items = iter(iterable)
+    in_flight = {}
+
+    def submit_more():
+        while len(in_flight) < max_in_flight:
+            if chunksize == 1:
+                for item in items:
+                    in_flight[executor.submit(fn, item)] = [item]
+                    break
+                else:
+                    return
+            else:
+                chunk = list(itertools.islice(items, chunksize))
+                if not chunk:
+                    return
+                future = executor.submit(_call_chunk, fn, chunk)
+                in_flight[future] = chunk
+
+    submit_more()
+    try:
+        while in_flight:
+            done, _ = concurrent.futures.wait(
+                in_flight, return_when=concurrent.futures.FIRST_COMPLETED
+            )
+            finished = [(future, in_flight.pop(future)) for future in done]
+            submit_more()
+            for future, chunk in finished:
+                for item, exc, result in _outcomes(future, chunk, chunksize):
+                    if exc is None:
+                        yield item, result
+                    else:
+                        collector.add(exc, describe(item))
+    finally:
+        # Only reached with futures left if the caller stopped early.
+        for future in in_flight:
+            future.cancel()
+    group = collector.build()
+    if group is not None:
+        raise group
+
+
+def _call_chunk(fn, chunk):
+    """Run `fn` on every item of `chunk`, in the worker.  Failures are
+    returned rather than raised, so that one bad item doesn't lose the
+    results of the rest of the chunk.
+    """
+    outcomes = []
+    for item in chunk:
+        try:
+            outcomes.append((None, fn(item)))
+        except Exception as exc:
+            outcomes.append((exc, None))
+    return outcomes
+
+
+def _outcomes(future, chunk, chunksize):
+    """Generate ``(item, exception, result)`` for each item of `chunk`."""
+    exc = future.exception()
+    if exc is not None:
+        # The whole submission failed (or, unchunked, the single call did),
+        # so every item in it failed with the same exception.
+        for item in chunk:
+            yield item, exc, None
+    elif chunksize == 1:
+        yield chunk[0], None, future.result()
+    else:
+        for item, (exc, result) in zip(chunk, future.result()):
+            yield item, exc, result
+
+
+def as_completed_group(
+    futures,
+    *,
+    timeout=None,
+    describe=repr,
+    message="errors in as_completed_group"
+):
+    """Generate ``(source, result)`` pairs as `futures` finish, and then raise
+    an :class:`ExceptionGroup` of the ones that failed.
+
+    Cancelled futures are skipped.
+
+    Args:
+      futures: Either a mapping from futures to their sources, like the
+        ``{executor.submit(fn, item): item}`` idiom, or an iterable of
+        futures, whose sources are then ``"future N"``.
+      timeout: As for :func:`concurrent.futures.as_completed`.
+      describe: Turns the source of a failed future from a mapping into its
+        source in the group, as for :func:`run_all`.
+      message (str): The message of the raised group.
+    """
+    import concurrent.futures
+
+    if not hasattr(futures, "items"):
+        futures = {
+            future: "future {}".format(i) for i, future in enumerate(futures)
+        }
+        describe = str
+    collector = ExceptionGroupCollector(message)
+    for future in concurrent.futures.as_completed(futures, timeout):
+        if future.cancelled():
+            continue
+        exc = future.exception()
+        if exc is None:
+            yield futures[future], future.result()
+        else:
+            collector.add(exc, describe(futures[future]))
+    group = collector.build()
+    if group is not None:
+        raise group
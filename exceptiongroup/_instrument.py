@@ -0,0 +1,144 @@
+################################################################
+# Instrumentation: reporting what split, catch and formatting do
+################################################################
+
+import threading
+from collections import OrderedDict
+
+from . import ExceptionGroup
+
+# The registered hooks.  Instrumented code checks this list before doing any
+# measuring, so while it is empty instrumentation costs one truth test.  It
+# is only ever changed in place, so modules can import it by name.
+hooks = []
+
+
+def add_instrumentation_hook(hook):
+    """Call ``hook(event)`` whenever exceptiongroup splits, catches or
+    formats an exception.
+
+    `event` is a dict with the keys:
+
+    - ``"event"``: one of ``"split"``, ``"partition"``, ``"catch"`` (the
+      exit of a :func:`catch` context manager with an exception),
+      ``"capture"`` (creating a :class:`traceback.TracebackException` for a
+      group) or ``"format"`` (formatting one, including capturing its
+      children)
+    - ``"nodes"``: the number of exceptions in the tree, groups included
+    - ``"depth"``: how deeply groups are nested in it; 0 for a plain
+      exception
+    - ``"elapsed"``: the time taken, in seconds
+
+    ``"catch"`` events also have ``"handler"``, the handler's qualified name,
+    and ``"handled"``, whether it was called.  Hooks are called on the thread
+    doing the work, so they should be quick.
+
+    Returns:
+      `hook`, so this can be used as a decorator.
+    """
+    hooks.append(hook)
+    return hook
+
+
+def remove_instrumentation_hook(hook):
+    """Stop calling `hook`; see :func:`add_instrumentation_hook`.
+
+    Raises:
+      ValueError: if `hook` isn't registered.
+    """
+    hooks.remove(hook)
+
+
+def report(event, exc, elapsed, **extra):
+    """Send an event about the tree `exc` to every hook."""
+    emit(event, tree_stats(exc), elapsed, **extra)
+
+
+def emit(event, stats, elapsed, **extra):
+    """Send an event to every hook, given the ``(nodes, depth)`` of the tree
+    it is about.
+    """
+    nodes, depth = stats
+    info = dict(
+        event=event, nodes=nodes, depth=depth, elapsed=elapsed, **extra
+    )
+    for hook in list(hooks):
+        hook(info)
+
+
+def tree_stats(exc):
+    """Return the number of exceptions in the tree `exc`, and its depth."""
+    nodes = 0
+    depth = 0
+    stack = [(exc, 0)]
+    while stack:
+        exc, level = stack.pop()
+        nodes += 1
+        if isinstance(exc, ExceptionGroup):
+            level += 1
+            depth = max(depth, level)
+            stack.extend((child, level) for child in exc.exceptions)
+    return nodes, depth
+
+
+def handler_name(handler):
+    return getattr(handler, "__qualname__", None) or repr(handler)
+
+
+class InstrumentationCounters:
+    """A hook that adds events up, for exporting as metrics.
+
+    Example:
+        counters = add_instrumentation_hook(InstrumentationCounters())
+        ...
+        metrics.update(counters.as_dict())
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._events = OrderedDict()
+        self._handlers = OrderedDict()
+
+    def __call__(self, event):
+        with self._lock:
+            totals = self._events.get(event["event"])
+            if totals is None:
+                totals = self._events[event["event"]] = dict(
+                    count=0, nodes=0, max_depth=0, elapsed=0.0, max_elapsed=0.0
+                )
+            totals["count"] += 1
+            totals["nodes"] += event["nodes"]
+            totals["max_depth"] = max(totals["max_depth"], event["depth"])
+            totals["elapsed"] += event["elapsed"]
+            totals["max_elapsed"] = max(
+                totals["max_elapsed"], event["elapsed"]
+            )
+            if event.get("handled"):
+                name = event["handler"]
+                self._handlers[name] = self._handlers.get(name, 0) + 1
+
+    def as_dict(self):
+        """Return the totals so far, as
+        ``{"events": {event: totals}, "handlers": {handler: calls}}``, where
+        totals has the keys ``count``, ``nodes``, ``max_depth``,
+        ``elapsed`` and ``max_elapsed``.
+        """
+        with self._lock:
+            return OrderedDict(
+                [
+                    (
+                        "events",
+                        OrderedDict(
+                            (name, dict(totals))
+                            for name, totals in self._events.items()
+                        ),
+                    ),
+                    ("handlers", OrderedDict(self._handlers)),
+                ]
+            )
+
+    def reset(self):
+        """Start counting from zero again."""
+        with self._lock:
+            self._events.clear()
+            self._handlers.clear()
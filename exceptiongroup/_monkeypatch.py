@@ -6,14 +6,79 @@
 # ExceptionGroups.
 ################################################################
 
+import os
 import sys
-import textwrap
+import threading
 import traceback
 import warnings
+from contextlib import contextmanager
+from time import perf_counter
 
 from . import ExceptionGroup
+from ._pickling import summary_stack
+from ._instrument import hooks, emit, tree_stats
+from ._source import SourceLines
 
 traceback_exception_original_init = traceback.TracebackException.__init__
+traceback_exception_original_format = traceback.TracebackException.format
+
+# Whether install() should run as soon as the first ExceptionGroup is
+# created.  Setting EXCEPTIONGROUP_NO_PATCH in the environment turns that
+# off, leaving it to an explicit call.
+auto_install = not os.environ.get("EXCEPTIONGROUP_NO_PATCH")
+
+# Budgets for capturing the children of ExceptionGroups, and for the output
+# of the excepthook; see set_traceback_limits.  None means unlimited.
+max_children = None
+max_depth = None
+max_frames_per_child = None
+max_excepthook_bytes = None
+
+# Whether the source lines of the children of a group are looked up for the
+# whole tree at once (see SourceLines).  The stacks this builds lack the
+# column information that Python 3.11+ tracebacks show.
+prefetch_source_lines = sys.version_info < (3, 10)
+
+
+def set_traceback_limits(
+    *,
+    max_children=None,
+    max_depth=None,
+    max_frames_per_child=None,
+    max_excepthook_bytes=None
+):
+    """Limit how much of an ExceptionGroup ends up in its traceback.
+
+    The capture limits apply to tracebacks captured after the call; whatever
+    is left out is summarized with a line saying how many exceptions were not
+    shown.  Passing None (the default) for a limit removes it.
+
+    Args:
+      max_children (int or None): The most children shown for each group,
+        and listed in its message.
+      max_depth (int or None): How deeply nested groups can be before their
+        children are no longer shown; 0 shows no children at all.
+      max_frames_per_child (int or None): The most stack frames shown for
+        each child, like the ``limit`` argument of :mod:`traceback`
+        functions.
+      max_excepthook_bytes (int or None): The most bytes of traceback that
+        the excepthook writes for an uncaught exception, like the `max_bytes`
+        argument of :func:`print_exception_group`.
+    """
+    for name, value in [
+        ("max_children", max_children),
+        ("max_depth", max_depth),
+        ("max_frames_per_child", max_frames_per_child),
+        ("max_excepthook_bytes", max_excepthook_bytes),
+    ]:
+        if value is not None and value < 0:
+            raise ValueError("{} must be None or non-negative".format(name))
+    globals().update(
+        max_children=max_children,
+        max_depth=max_depth,
+        max_frames_per_child=max_frames_per_child,
+        max_excepthook_bytes=max_excepthook_bytes,
+    )
 
 
 def traceback_exception_init(
@@ -25,10 +90,19 @@ def traceback_exception_init(
     limit=None,
     lookup_lines=True,
     capture_locals=False,
-    _seen=None
+    _seen=None,
+    _group_depth=0
 ):
     if _seen is None:
-        _seen = set()
+        _seen = _SeenSet()
+    start = perf_counter() if hooks and _group_depth == 0 else None
+    # Inside a group, the lines of our own frames have already been looked
+    # up, so the stack is extracted here rather than by the original init.
+    # (Causes and contexts are captured without looking up their lines, which
+    # their outermost exception then does; taking them from the group's
+    # SourceLines instead comes to the same.)
+    source_lines = getattr(_seen, "source_lines", None)
+    prefetched = source_lines is not None and exc_traceback is not None
 
     # Capture the original exception and its cause and context as
     # TracebackExceptions
@@ -36,91 +110,507 @@ def traceback_exception_init(
         self,
         exc_type,
         exc_value,
-        exc_traceback,
+        None if prefetched else exc_traceback,
         limit=limit,
         lookup_lines=lookup_lines,
         capture_locals=capture_locals,
         _seen=_seen,
     )
+    if prefetched:
+        self.stack = source_lines.extract(exc_traceback, limit, capture_locals)
+    # Exceptions that crossed a process boundary have no traceback, but may
+    # have a summary of it.
+    if exc_traceback is None and exc_value is not None:
+        stack = summary_stack(exc_value, limit)
+        if stack is not None:
+            self.stack = stack
 
-    # Capture each of the exceptions in the ExceptionGroup along with each of
-    # their causes and contexts
+    # The children of an ExceptionGroup are only captured once they're needed
+    # (see traceback_exception_capture_children), since that means looking up
+    # the source lines of every frame of every child.  For now just remember
+    # which ones fit into the budget.
+    self._children_elided = 0
+    self._tree_stats = None
     if isinstance(exc_value, ExceptionGroup):
-        exceptions = []
-        sources = []
-        for exc, source in zip(exc_value.exceptions, exc_value.sources):
-            if exc not in _seen:
-                exceptions.append(
-                    traceback.TracebackException.from_exception(
-                        exc,
-                        limit=limit,
-                        lookup_lines=lookup_lines,
-                        capture_locals=capture_locals,
-                        # copy the set of _seen exceptions so that duplicates
-                        # shared between sub-exceptions are not omitted
-                        _seen=set(_seen),
-                    )
-                )
-                sources.append(source)
-        self.exceptions = exceptions
-        self.sources = sources
+        children = list(zip(exc_value.exceptions, exc_value.sources))
+        if max_depth is not None and _group_depth >= max_depth:
+            shown = 0
+        elif max_children is not None:
+            shown = max_children
+        else:
+            shown = len(children)
+        self._children_elided = max(len(children) - shown, 0)
+        del children[shown:]
+        if (
+            max_children is not None
+            and type(exc_value).__str__ is ExceptionGroup.__str__
+        ):
+            # The message lists every exception in the tree, so it's capped
+            # as well.  (The original __init__ has built the whole of it by
+            # now, but at least it isn't printed.)
+            self._str = _group_str(exc_value, max_children)
+        child_limit = limit
+        if max_frames_per_child is not None:
+            child_limit = max_frames_per_child
+            if limit is not None:
+                # A negative limit means the last frames, so only its size
+                # is capped.
+                child_limit = min(abs(limit), max_frames_per_child)
+                if limit < 0:
+                    child_limit = -child_limit
+        self._pending_children = (
+            children,
+            dict(
+                limit=child_limit,
+                lookup_lines=lookup_lines,
+                capture_locals=capture_locals,
+                _group_depth=_group_depth + 1,
+            ),
+            # Snapshot the exceptions seen so far: by the time the children
+            # are captured, more may have been added.
+            _snapshot_seen(_seen),
+            source_lines,
+        )
+        if start is not None:
+            elapsed = perf_counter() - start
+            # Kept for reporting the "format" event too.
+            self._tree_stats = tree_stats(exc_value)
+            emit("capture", self._tree_stats, elapsed)
     else:
-        self.exceptions = []
-        self.sources = []
+        self._pending_children = ([], None, None, None)
+
+
+def _group_str(group, limit):
+    """Like ``str(group)``, but listing at most `limit` exceptions of each
+    group, and saying how many more there are.
+    """
+    reprs = []
+    for exc in group.exceptions[:limit]:
+        if (
+            type(exc).__repr__ is ExceptionGroup.__repr__
+            and type(exc).__str__ is ExceptionGroup.__str__
+        ):
+            reprs.append("<ExceptionGroup: {}>".format(_group_str(exc, limit)))
+        else:
+            reprs.append(repr(exc))
+    if len(group.exceptions) > limit:
+        reprs.append("... ({} more)".format(len(group.exceptions) - limit))
+    return ", ".join(reprs)
+
+
+class _SeenSet:
+    """The ids of the exceptions already captured along the current path,
+    passed around as the ``_seen`` argument of TracebackException.
+
+    A plain set would have to be copied for every child of a group, so that
+    siblings don't hide each other's exceptions.  Instead, each child gets an
+    empty layer of its own on top of its parent's ids, which are shared: the
+    cost of a lookup is proportional to the depth of the path, not to the
+    size of the whole tree.
+
+    Below a group, it also carries the SourceLines of the group's tree, which
+    can't be passed along any other way to the causes and contexts that the
+    original TracebackException captures.
+    """
+
+    __slots__ = ("ids", "parent", "source_lines")
+
+    def __init__(self, parent=None, source_lines=None):
+        self.ids = set()
+        self.parent = parent
+        self.source_lines = source_lines
+
+    def add(self, exc_id):
+        self.ids.add(exc_id)
+
+    def __contains__(self, exc_id):
+        layer = self
+        while layer is not None:
+            if exc_id in layer.ids:
+                return True
+            layer = layer.parent
+        return False
+
+
+def _snapshot_seen(seen):
+    """Returns a _SeenSet (or None) holding what is in `seen` right now, that
+    won't change when more ids are added to `seen` later.
+    """
+    if not isinstance(seen, _SeenSet):
+        snapshot = _SeenSet()
+        snapshot.ids = set(seen)
+        return snapshot
+    if seen.ids:
+        # Freeze the current ids into a layer of their own, and have `seen`
+        # continue in a fresh layer on top of it.
+        frozen = _SeenSet(seen.parent)
+        frozen.ids = seen.ids
+        seen.ids = set()
+        seen.parent = frozen
+    return seen.parent
+
+
+def traceback_exception_capture_children(self):
+    """Capture each of the exceptions in the ExceptionGroup along with each of
+    their causes and contexts, if that hasn't happened yet.
+    """
+    if self._pending_children is None:
+        return
+    children, options, seen, source_lines = self._pending_children
+    self._pending_children = None
+    if (
+        children
+        and source_lines is None
+        and options["lookup_lines"]
+        and prefetch_source_lines
+    ):
+        # This is the outermost group: look up the lines of everything
+        # below it that is shown in one go.
+        source_lines = SourceLines(
+            (exc for exc, _ in children),
+            limit=options["limit"],
+            depth=options["_group_depth"],
+            max_children=max_children,
+            max_depth=max_depth,
+        )
+    exceptions = []
+    sources = []
+    for exc, source in children:
+        if exc not in seen:
+            exceptions.append(
+                traceback.TracebackException.from_exception(
+                    exc,
+                    # give each child its own layer on top of the _seen
+                    # exceptions so that duplicates shared between
+                    # sub-exceptions are not omitted
+                    _seen=_SeenSet(seen, source_lines),
+                    **options
+                )
+            )
+            sources.append(source)
+    self._exceptions = exceptions
+    self._sources = sources
+
+
+def traceback_exception_exceptions(self):
+    traceback_exception_capture_children(self)
+    return self._exceptions
+
+
+def traceback_exception_sources(self):
+    traceback_exception_capture_children(self)
+    return self._sources
 
 
 def traceback_exception_format(self, *, chain=True):
-    yield from traceback_exception_original_format(self, chain=chain)
+    if self._tree_stats is None or not hooks:
+        yield from traceback_exception_format_lines(self, chain)
+        return
+    start = perf_counter()
+    try:
+        yield from traceback_exception_format_lines(self, chain)
+    finally:
+        emit("format", self._tree_stats, perf_counter() - start)
+
+
+def traceback_exception_format_lines(self, chain, prefix=""):
+    """Generate the lines of the TracebackException `self`, with the children
+    of groups indented under them, and everything indented by `prefix`.
 
+    Each line is indented once, with its final prefix, rather than once for
+    every group it is nested in.
+    """
+    for line in traceback_exception_original_format(self, chain=chain):
+        yield _indent(line, prefix)
+
+    child_prefix = prefix + " " * 4
     for exc, source in zip(self.exceptions, self.sources):
-        yield "\n  {}:\n\n".format(source)
-        yield from (
-            textwrap.indent(line, " " * 4) for line in exc.format(chain=chain)
+        yield _indent("\n  {}:\n\n".format(source), prefix)
+        yield from traceback_exception_format_lines(exc, chain, child_prefix)
+    if self._children_elided:
+        yield _indent(
+            "\n  ... {} more exceptions not shown\n".format(
+                self._children_elided
+            ),
+            prefix,
         )
 
 
+def _indent(text, prefix):
+    """Like :func:`textwrap.indent`: add `prefix` to the lines of `text` that
+    aren't just whitespace.
+    """
+    if not prefix:
+        return text
+    return "".join(
+        prefix + line if line.strip() else line
+        for line in text.splitlines(True)
+    )
+
+
+# How many characters of output are gathered before each write.
+WRITE_CHUNK_SIZE = 8192
+
+
+def print_exception_group(exc, file=None, *, max_bytes=None, chain=True):
+    """Print the traceback of `exc`, including all the exceptions it groups.
+
+    Unlike :func:`traceback.print_exception`, the output is written to `file`
+    in chunks while it is being formatted, so the whole traceback of a large
+    group never has to be held in memory at once.
+
+    Args:
+      exc (BaseException): The exception to print.
+      file: Where to write the traceback; defaults to ``sys.stderr``.
+      max_bytes (int or None): If not None, the most bytes (encoded as
+        UTF-8) to write.  A traceback that doesn't fit is cut short and ends
+        with a line saying that it was truncated, which counts towards the
+        limit too.
+      chain (bool): Whether to print the ``__cause__`` and ``__context__``
+        of exceptions too.
+
+    This works even if the patches aren't installed: then
+    :class:`traceback.TracebackException` is only patched while the
+    traceback is being printed.
+    """
+    with traceback_patched():
+        print_exception_lines(
+            traceback.TracebackException(type(exc), exc, exc.__traceback__),
+            file,
+            max_bytes=max_bytes,
+            chain=chain,
+        )
+
+
+def print_exception_lines(te, file=None, *, max_bytes=None, chain=True):
+    """Stream the lines of the TracebackException `te` to `file`, see
+    :func:`print_exception_group`.
+    """
+    if file is None:
+        file = sys.stderr
+    if max_bytes is not None:
+        # The marker has to fit into the budget too, so lines that would
+        # leave no room for it are held back until it's clear whether the
+        # traceback fits as a whole.
+        marker = "... (traceback truncated at {} bytes)\n".format(max_bytes)
+        marker = marker[:max_bytes]
+        unreserved = max_bytes - len(marker)
+    written = 0
+    held = []
+    held_size = 0
+    chunk = []
+    chunk_size = 0
+    for line in te.format(chain=chain):
+        if max_bytes is not None:
+            size = len(line.encode("utf-8", "replace"))
+            if written + held_size + size > unreserved:
+                if written + held_size + size > max_bytes:
+                    # Keep what fits of the line that overflows: it may be a
+                    # long one, such as the message of a large group.
+                    held = _truncate(
+                        "".join(held) + line, unreserved - written
+                    )
+                    held.append(marker)
+                    break
+                held.append(line)
+                held_size += size
+                continue
+            written += size
+        chunk.append(line)
+        chunk_size += len(line)
+        if chunk_size >= WRITE_CHUNK_SIZE:
+            file.write("".join(chunk))
+            chunk = []
+            chunk_size = 0
+    chunk.extend(held)
+    if chunk:
+        file.write("".join(chunk))
+
+
+def _truncate(text, max_bytes):
+    """Return a list holding as much of the start of `text` as fits into
+    `max_bytes` when encoded as UTF-8, cut between two characters and ending
+    with a newline.
+    """
+    if max_bytes <= 0:
+        return []
+    text = text.encode("utf-8", "replace")[:max_bytes]
+    if not text.endswith(b"\n"):
+        text = text[: max_bytes - 1]
+    text = text.decode("utf-8", "ignore")
+    if text and not text.endswith("\n"):
+        text += "\n"
+    return [text]
+
+
 def exceptiongroup_excepthook(etype, value, tb):
-    sys.stderr.write("".join(traceback.format_exception(etype, value, tb)))
+    print_exception_lines(
+        traceback.TracebackException(type(value), value, tb),
+        max_bytes=max_excepthook_bytes,
+    )
 
 
-traceback.TracebackException.__init__ = traceback_exception_init
-traceback_exception_original_format = traceback.TracebackException.format
-traceback.TracebackException.format = traceback_exception_format
+def install():
+    """Teach the :mod:`traceback` module, ``sys.excepthook`` and IPython to
+    show the exceptions inside ExceptionGroups.
+
+    This happens automatically when the first ExceptionGroup is created,
+    unless the ``EXCEPTIONGROUP_NO_PATCH`` environment variable is set.
+    Calling it again does nothing, except that each call warns (once) if a
+    custom excepthook or IPython exception handler is in the way.
+    """
+    global auto_install, temporary_patch
+    auto_install = False
+    with temporary_patch_lock:
+        patch_traceback()
+        temporary_patch = False
+    install_hooks()
+
+
+def install_automatically():
+    """Like :func:`install`, for the first ExceptionGroup to run.
+
+    This may happen in the middle of anything, such as :func:`catch` or
+    unpickling, so it doesn't warn about hooks it can't install: under
+    ``-W error`` that would make creating the group fail.
+    """
+    global auto_install, temporary_patch
+    auto_install = False
+    with temporary_patch_lock:
+        patch_traceback()
+        temporary_patch = False
+    install_hooks(warn=False)
+
+
+def uninstall():
+    """Undo :func:`install`, and keep it from happening automatically."""
+    global auto_install, IPython_handler_installed, temporary_patch
+    auto_install = False
+    with temporary_patch_lock:
+        if temporary_patch_users:
+            # Leave it to the last of them.
+            temporary_patch = True
+        else:
+            unpatch_traceback()
+    if IPython_handler_installed:
+        IPython_shell.set_custom_exc((), None)
+        IPython_handler_installed = False
+    if sys.excepthook is exceptiongroup_excepthook:
+        sys.excepthook = sys.__excepthook__
+
 
+# Since the patches are installed lazily, there may be TracebackExceptions
+# around that were created before, by the original __init__.  These class
+# attributes make them look like ones without children.
+PATCHED_DEFAULTS = {
+    "_children_elided": 0,
+    "_tree_stats": None,
+    "_pending_children": ((), None, None, None),
+}
+
+
+def patch_traceback():
+    if traceback.TracebackException.__init__ is traceback_exception_init:
+        return
+    traceback.TracebackException.__init__ = traceback_exception_init
+    for name, value in PATCHED_DEFAULTS.items():
+        setattr(traceback.TracebackException, name, value)
+    traceback.TracebackException.exceptions = property(
+        traceback_exception_exceptions
+    )
+    traceback.TracebackException.sources = property(
+        traceback_exception_sources
+    )
+    traceback.TracebackException.format = traceback_exception_format
+
+
+def unpatch_traceback():
+    if traceback.TracebackException.__init__ is not traceback_exception_init:
+        return
+    traceback.TracebackException.__init__ = traceback_exception_original_init
+    traceback.TracebackException.format = traceback_exception_original_format
+    for name in PATCHED_DEFAULTS:
+        delattr(traceback.TracebackException, name)
+    del traceback.TracebackException.exceptions
+    del traceback.TracebackException.sources
+
+
+# print_exception_group works without the patches installed, by patching
+# only while it runs.  temporary_patch says whether the current patch is to
+# be removed once the last of the temporary_patch_users is done.
+temporary_patch_lock = threading.Lock()
+temporary_patch = False
+temporary_patch_users = 0
+
+
+@contextmanager
+def traceback_patched():
+    """Make sure that TracebackException is patched within the block, and
+    if it wasn't before, unpatch it afterwards.
+    """
+    global temporary_patch, temporary_patch_users
+    with temporary_patch_lock:
+        if (
+            traceback.TracebackException.__init__
+            is not traceback_exception_init
+        ):
+            patch_traceback()
+            temporary_patch = True
+        temporary_patch_users += 1
+    try:
+        yield
+    finally:
+        with temporary_patch_lock:
+            temporary_patch_users -= 1
+            if temporary_patch and not temporary_patch_users:
+                unpatch_traceback()
+                temporary_patch = False
+
+
+IPython_shell = None
 IPython_handler_installed = False
 warning_given = False
-if "IPython" in sys.modules:
-    import IPython
 
-    ip = IPython.get_ipython()
-    if ip is not None:
-        if ip.custom_exceptions != ():
+
+def install_hooks(warn=True):
+    global IPython_shell, IPython_handler_installed, warning_given
+    if "IPython" in sys.modules and not IPython_handler_installed:
+        import IPython
+
+        ip = IPython.get_ipython()
+        if ip is not None:
+            if ip.custom_exceptions != ():
+                if warn and not warning_given:
+                    warnings.warn(
+                        "IPython detected, but you already have a custom "
+                        "exception handler installed. I'll skip installing "
+                        "exceptiongroup's custom handler, but this means you "
+                        "won't see full tracebacks for ExceptionGroups.",
+                        category=RuntimeWarning,
+                    )
+                    warning_given = True
+            else:
+
+                def trio_show_traceback(
+                    self, etype, value, tb, tb_offset=None
+                ):
+                    # XX it would be better to integrate with IPython's fancy
+                    # exception formatting stuff (and not ignore tb_offset)
+                    exceptiongroup_excepthook(etype, value, tb)
+
+                ip.set_custom_exc((ExceptionGroup,), trio_show_traceback)
+                IPython_shell = ip
+                IPython_handler_installed = True
+
+    if sys.excepthook is sys.__excepthook__:
+        sys.excepthook = exceptiongroup_excepthook
+    elif sys.excepthook is not exceptiongroup_excepthook:
+        if warn and not IPython_handler_installed and not warning_given:
             warnings.warn(
-                "IPython detected, but you already have a custom exception "
-                "handler installed. I'll skip installing exceptiongroup's "
-                "custom handler, but this means you won't see full tracebacks "
-                "for ExceptionGroups.",
+                "You seem to already have a custom sys.excepthook handler "
+                "installed. I'll skip installing exceptiongroup's custom "
+                "handler, but this means you won't see full tracebacks for "
+                "ExceptionGroups.",
                 category=RuntimeWarning,
             )
             warning_given = True
-        else:
-
-            def trio_show_traceback(self, etype, value, tb, tb_offset=None):
-                # XX it would be better to integrate with IPython's fancy
-                # exception formatting stuff (and not ignore tb_offset)
-                exceptiongroup_excepthook(etype, value, tb)
-
-            ip.set_custom_exc((ExceptionGroup,), trio_show_traceback)
-            IPython_handler_installed = True
-
-if sys.excepthook is sys.__excepthook__:
-    sys.excepthook = exceptiongroup_excepthook
-else:
-    if not IPython_handler_installed and not warning_given:
-        warnings.warn(
-            "You seem to already have a custom sys.excepthook handler "
-            "installed. I'll skip installing exceptiongroup's custom handler, "
-            "but this means you won't see full tracebacks for "
-            "ExceptionGroups.",
-            category=RuntimeWarning,
-        )
@@ -0,0 +1,107 @@
+################################################################
+# Pickling ExceptionGroups with their tracebacks and chaining
+################################################################
+
+import traceback
+
+from . import ExceptionGroup, _set_args
+
+# Name of the attribute holding the frames of a traceback that could not be
+# kept alive, as a tuple of (filename, lineno, name, line) tuples.
+SUMMARY_ATTR = "__traceback_summary__"
+
+
+def traceback_summary(exc):
+    """Return the frames of `exc`'s traceback as plain tuples, or None if it
+    has none.
+    """
+    if exc.__traceback__ is None:
+        return getattr(exc, SUMMARY_ATTR, None)
+    return tuple(
+        (frame.filename, frame.lineno, frame.name, frame.line)
+        for frame in traceback.extract_tb(exc.__traceback__)
+    )
+
+
+def summary_stack(exc, limit=None):
+    """Return the saved frames of `exc` as a :class:`traceback.StackSummary`,
+    or None if it has none.
+    """
+    frames = getattr(exc, SUMMARY_ATTR, None)
+    if frames is None:
+        return None
+    if limit is not None:
+        frames = frames[:limit] if limit >= 0 else frames[limit:]
+    return traceback.StackSummary.from_list(frames)
+
+
+def reduce_group(group):
+    """Implements ``ExceptionGroup.__reduce__``.
+
+    The whole tree under `group` -- children, causes and contexts -- is
+    flattened into one table with an entry per distinct exception, which
+    refers to others by their position in it.  An exception that appears in
+    several places is thus encoded once.  Leaf exceptions are pickled as
+    usual, and their chaining and tracebacks are restored from the table.
+    """
+    index = {id(group): 0}
+    found = [group]
+
+    def ref(exc):
+        if exc is None:
+            return None
+        position = index.get(id(exc))
+        if position is None:
+            position = index[id(exc)] = len(found)
+            found.append(exc)
+        return position
+
+    entries = []
+    # found grows as we go
+    for exc in found:
+        if isinstance(exc, ExceptionGroup):
+            state = dict(exc.__dict__)
+            state.pop(SUMMARY_ATTR, None)
+            shell = (type(exc), exc.message, list(exc.sources), state)
+            children = [ref(child) for child in exc.exceptions]
+        else:
+            shell = exc
+            children = None
+        entries.append(
+            (
+                shell,
+                children,
+                traceback_summary(exc),
+                ref(exc.__cause__),
+                ref(exc.__context__),
+                exc.__suppress_context__,
+            )
+        )
+    return _rebuild_group, (entries,)
+
+
+def _rebuild_group(entries):
+    # First create every exception, then link them up, since there may be
+    # cycles.
+    objects = []
+    for shell, children, _, _, _, _ in entries:
+        if children is None:
+            objects.append(shell)
+        else:
+            cls, message, sources, state = shell
+            group = cls._from_validated(message, (), sources)
+            group.__dict__.update(state)
+            objects.append(group)
+    for exc, entry in zip(objects, entries):
+        _, children, frames, cause, context, suppress_context = entry
+        if children is not None:
+            # The group is brand new, so nothing can have indexed it yet:
+            # set its children without invalidating every other index.
+            exceptions = tuple(objects[i] for i in children)
+            _set_args(exc, (exc.message, exceptions, exc.sources))
+        if frames is not None:
+            setattr(exc, SUMMARY_ATTR, frames)
+        exc.__cause__ = None if cause is None else objects[cause]
+        exc.__context__ = None if context is None else objects[context]
+        exc.__suppress_context__ = suppress_context
+    return objects[0]
@@ -0,0 +1,135 @@
+################################################################
+# Looking through ExceptionGroup trees without copying them
+################################################################
+
+from collections import OrderedDict
+
+from . import ExceptionGroup
+
+
+def iter_leaves(exc):
+    """Generate ``(leaf, path)`` for every leaf exception in `exc`.
+
+    `path` is a tuple of the sources leading from `exc` down to the leaf, so
+    a plain exception that isn't a group yields ``(exc, ())``.  Leaves come in
+    the order they appear in the tree, and one that appears in several places
+    is yielded once for each.  Nothing is copied, and the tree is walked
+    without recursion, however deep it is.
+    """
+    if not isinstance(exc, ExceptionGroup):
+        yield exc, ()
+        return
+    stack = [(iter(zip(exc.exceptions, exc.sources)), ())]
+    while stack:
+        children, path = stack[-1]
+        for child, source in children:
+            if isinstance(child, ExceptionGroup):
+                stack.append(
+                    (
+                        iter(zip(child.exceptions, child.sources)),
+                        path + (source,),
+                    )
+                )
+                break
+            yield child, path + (source,)
+        else:
+            stack.pop()
+
+
+def _leaves(exc):
+    """Like :func:`iter_leaves`, but without the paths."""
+    if not isinstance(exc, ExceptionGroup):
+        yield exc
+        return
+    stack = [iter(exc.exceptions)]
+    while stack:
+        for child in stack[-1]:
+            if isinstance(child, ExceptionGroup):
+                stack.append(iter(child.exceptions))
+                break
+            yield child
+        else:
+            stack.pop()
+
+
+def find_first(exc_type, exc, match=None):
+    """Return the first leaf of `exc` that is an instance of `exc_type` and,
+    if `match` is not None, for which ``match(leaf)`` is true; or None if
+    there isn't one.
+
+    The search stops at the first hit.  As with :func:`split`, only leaves
+    are considered, not the groups containing them.
+    """
+    for leaf in _leaves(exc):
+        if isinstance(leaf, exc_type) and (match is None or match(leaf)):
+            return leaf
+    return None
+
+
+def contains(exc_type, exc, match=None):
+    """Return whether `exc` has a leaf that :func:`split` would put into its
+    matched part, without building either part.  See :func:`find_first`.
+    """
+    return find_first(exc_type, exc, match) is not None
+
+
+def count_by_type(exc):
+    """Count the leaves of `exc` by their exact type.
+
+    Returns:
+      A dict mapping each type to its count, in the order the types first
+      appear in the tree.
+    """
+    counts = OrderedDict()
+    for leaf in _leaves(exc):
+        leaf_type = type(leaf)
+        counts[leaf_type] = counts.get(leaf_type, 0) + 1
+    return counts
+
+
+def leaf_index(group):
+    """Return ``(leaf_types, leaf_count, has_empty_group)`` for the
+    ExceptionGroup `group`: the set of the exact types of its leaves, how
+    many there are, and whether it or any group nested in it is empty.
+
+    The result is cached on the group until the ``exceptions`` or ``args``
+    of any group are assigned.  As the exceptions are a tuple, that is the
+    only way they can change.  Nested groups that already have an index
+    aren't walked again.
+    """
+    generation = ExceptionGroup._exceptions_generation
+    cached = getattr(group, "_leaf_index", None)
+    if cached is not None and cached[0] == generation:
+        return cached[1:]
+    leaf_types = set()
+    leaf_count = 0
+    has_empty_group = False
+    stack = [group]
+    while stack:
+        exceptions = stack.pop().exceptions
+        if not exceptions:
+            has_empty_group = True
+            continue
+        if len(exceptions) > 16:
+            # Wide groups of nothing but leaves are common, and can be
+            # indexed without a Python-level loop.
+            child_types = set(map(type, exceptions))
+            if not any(issubclass(t, ExceptionGroup) for t in child_types):
+                leaf_types |= child_types
+                leaf_count += len(exceptions)
+                continue
+        for child in exceptions:
+            if isinstance(child, ExceptionGroup):
+                cached = getattr(child, "_leaf_index", None)
+                if cached is not None and cached[0] == generation:
+                    leaf_types.update(cached[1])
+                    leaf_count += cached[2]
+                    has_empty_group = has_empty_group or cached[3]
+                else:
+                    stack.append(child)
+            else:
+                leaf_types.add(type(child))
+                leaf_count += 1
+    leaf_types = frozenset(leaf_types)
+    group._leaf_index = (generation, leaf_types, leaf_count, has_empty_group)
+    return leaf_types, leaf_count, has_empty_group
@@ -0,0 +1,221 @@
+################################################################
+# Looking up the source lines of a whole ExceptionGroup tree at once
+################################################################
+
+import collections
+import linecache
+import os
+import sys
+import traceback
+
+from . import ExceptionGroup
+
+# Files at least this big that linecache doesn't already hold are
+# memory-mapped, and only the lines that are needed are decoded, instead of
+# the whole file being read into linecache.  This is meant for very large
+# generated modules.
+MMAP_THRESHOLD = 1 << 20
+
+# How many bytes are skipped over at a time when looking for a line in a
+# memory-mapped file.
+_SCAN_CHUNK_SIZE = 1 << 16
+
+
+class SourceLines:
+    """The source lines of every frame in a tree of exceptions.
+
+    Capturing a traceback checks its files for changes and looks its lines
+    up frame by frame, so for a group with thousands of children raised from
+    the same few places, the same handful of files are stat'ed over and over.
+    Instead, this collects the frames of the whole tree first, and checks and
+    loads each file once.  Frames that weren't in the tree when it was
+    collected are looked up the usual way.
+
+    Only the frames that will be shown are collected, so the remaining
+    arguments are the limits that the tracebacks are captured with.
+
+    Args:
+      exceptions: The exceptions whose frames are needed, along with those of
+        their causes, contexts and (for groups) children.
+      limit (int or None): How many frames of each traceback are shown, like
+        the ``limit`` argument of :mod:`traceback` functions.
+      depth (int): How deeply `exceptions` are nested in groups.
+      max_children (int or None): How many children of each group are shown.
+      max_depth (int or None): How deeply nested groups can be before their
+        children are no longer shown.
+    """
+
+    def __init__(
+        self,
+        exceptions,
+        *,
+        limit=None,
+        depth=0,
+        max_children=None,
+        max_depth=None
+    ):
+        # filename -> (module globals, line numbers)
+        wanted = collections.OrderedDict()
+        tracebacks = _tracebacks(exceptions, depth, max_children, max_depth)
+        for tb in tracebacks:
+            for frame, lineno in _frames(tb, limit):
+                filename = frame.f_code.co_filename
+                entry = wanted.get(filename)
+                if entry is None:
+                    entry = wanted[filename] = (frame.f_globals, set())
+                entry[1].add(lineno)
+        self._lines = {}
+        for filename, (module_globals, linenos) in wanted.items():
+            lines = _load_mapped(filename, linenos)
+            if lines is None:
+                lines = _load_cached(filename, module_globals, linenos)
+            self._lines.update(
+                ((filename, lineno), line) for lineno, line in lines
+            )
+
+    def line(self, filename, lineno):
+        """Return the stripped source line, as :class:`traceback.FrameSummary`
+        would.
+        """
+        try:
+            return self._lines[filename, lineno]
+        except KeyError:
+            return linecache.getline(filename, lineno).strip()
+
+    def extract(self, tb, limit=None, capture_locals=False):
+        """Like :meth:`traceback.StackSummary.extract` for the traceback `tb`,
+        but with the lines taken from here.
+        """
+        stack = traceback.StackSummary()
+        for frame, lineno in _frames(tb, limit):
+            code = frame.f_code
+            summary = traceback.FrameSummary(
+                code.co_filename,
+                lineno,
+                code.co_name,
+                lookup_line=False,
+                locals=frame.f_locals if capture_locals else None,
+            )
+            summary._line = self.line(code.co_filename, lineno)
+            stack.append(summary)
+        return stack
+
+
+def _frames(tb, limit):
+    """Return ``(frame, lineno)`` for the frames of the traceback `tb` that
+    are shown with `limit`, as :meth:`traceback.StackSummary.extract` picks
+    them.
+    """
+    frames = []
+    while tb is not None:
+        frames.append((tb.tb_frame, tb.tb_lineno))
+        tb = tb.tb_next
+    if limit is None:
+        limit = getattr(sys, "tracebacklimit", None)
+        if limit is not None and limit < 0:
+            limit = 0
+    if limit is not None:
+        frames = frames[:limit] if limit >= 0 else frames[limit:]
+    return frames
+
+
+def _tracebacks(exceptions, depth, max_children, max_depth):
+    """Generate the traceback of every exception in the trees of
+    `exceptions` that is shown, see :class:`SourceLines`.
+    """
+    seen = set()
+    stack = [(exc, depth) for exc in reversed(list(exceptions))]
+    while stack:
+        exc, depth = stack.pop()
+        if exc is None or id(exc) in seen:
+            continue
+        seen.add(id(exc))
+        yield exc.__traceback__
+        # Causes and contexts are captured as exceptions of their own, so
+        # they start over at the top.
+        stack.append((exc.__context__, 0))
+        stack.append((exc.__cause__, 0))
+        if isinstance(exc, ExceptionGroup):
+            if max_depth is not None and depth >= max_depth:
+                continue
+            children = exc.exceptions
+            if max_children is not None:
+                children = children[:max_children]
+            stack.extend((child, depth + 1) for child in reversed(children))
+
+
+def _load_cached(filename, module_globals, linenos):
+    """Generate ``(lineno, line)`` for `linenos` of `filename` through
+    linecache, the way :meth:`traceback.StackSummary.extract` does.
+    """
+    linecache.lazycache(filename, module_globals)
+    linecache.checkcache(filename)
+    lines = linecache.getlines(filename)
+    for lineno in linenos:
+        if 1 <= lineno <= len(lines):
+            yield lineno, lines[lineno - 1].strip()
+        else:
+            yield lineno, ""
+
+
+def _load_mapped(filename, linenos):
+    """Return ``(lineno, line)`` pairs for `linenos` of `filename`, read
+    through a memory map; or None if the file is small or already cached, or
+    can't be read that way.
+    """
+    if filename in linecache.cache:
+        return None
+    try:
+        if os.path.getsize(filename) < MMAP_THRESHOLD:
+            return None
+    except (OSError, ValueError):
+        return None
+
+    import mmap
+    import tokenize
+
+    try:
+        with open(filename, "rb") as file:
+            encoding, _ = tokenize.detect_encoding(file.readline)
+            with mmap.mmap(
+                file.fileno(), 0, access=mmap.ACCESS_READ
+            ) as mapped:
+                if mapped.find(b"\r") != -1:
+                    # linecache splits lines on lone carriage returns as well
+                    return None
+                return [
+                    (lineno, line.decode(encoding).strip())
+                    for lineno, line in _mapped_lines(mapped, linenos)
+                ]
+    except (OSError, ValueError, SyntaxError, UnicodeDecodeError):
+        return None
+
+
+def _mapped_lines(mapped, linenos):
+    """Generate ``(lineno, line)`` for `linenos` of the memory-mapped file
+    `mapped`, as bytes.
+    """
+    # `offset` is always somewhere in line number `current`.
+    offset = 0
+    current = 1
+    for lineno in sorted(linenos):
+        if lineno < 1:
+            yield lineno, b""
+            continue
+        while current < lineno:
+            chunk = mapped[offset : offset + _SCAN_CHUNK_SIZE]
+            newlines = chunk.count(b"\n")
+            if current + newlines < lineno and len(chunk) == _SCAN_CHUNK_SIZE:
+                offset += len(chunk)
+                current += newlines
+                continue
+            end = mapped.find(b"\n", offset)
+            if end == -1:
+                break
+            offset = end + 1
+            current += 1
+        if current < lineno:
+            yield lineno, b""
+            continue
+        end = mapped.find(b"\n", offset)
+        yield lineno, mapped[offset : end if end != -1 else len(mapped)]
@@ -0,0 +1,6 @@
+def raise_value_error(value):
+    """Return a ValueError that has been raised, and so has a traceback."""
+    try:
+        raise ValueError(value)
+    except ValueError as e:
+        return e
@@ -0,0 +1,9 @@
+import sys
+
+# The patched traceback.TracebackException predates the keyword arguments
+# that the traceback module passes to it since Python 3.10, so formatting
+# tests can't run there.  They are left out of collection rather than
+# skipped, because pytest itself formats the skip through TracebackException.
+collect_ignore = []
+if sys.version_info >= (3, 10):
+    collect_ignore.append("test_monkeypatch.py")
@@ -0,0 +1,240 @@
+import asyncio
+
+import pytest
+
+from exceptiongroup import ExceptionGroup, TaskGroup, gather_group, acatch
+
+
+def run(coro):
+    loop = asyncio.new_event_loop()
+    try:
+        return loop.run_until_complete(coro)
+    finally:
+        loop.close()
+
+
+async def succeed(value, delay=0):
+    await asyncio.sleep(delay)
+    return value
+
+
+async def fail(exc, delay=0):
+    await asyncio.sleep(delay)
+    raise exc
+
+
+def test_task_group_success():
+    async def main():
+        async with TaskGroup() as tg:
+            a = tg.create_task(succeed(1))
+            b = tg.create_task(succeed(2, 0.01))
+        assert tg.tasks == [a, b]
+        return a.result(), b.result()
+
+    assert run(main()) == (1, 2)
+
+
+def test_task_group_collect_all():
+    error1 = ValueError("1")
+    error2 = KeyError("2")
+    finished = []
+
+    async def slow():
+        await asyncio.sleep(0.02)
+        finished.append(True)
+
+    async def main():
+        async with TaskGroup("failed") as tg:
+            tg.create_task(fail(error1), name="first")
+            tg.create_task(fail(error2, 0.01), name="second")
+            tg.create_task(slow(), name="slow")
+
+    with pytest.raises(ExceptionGroup) as excinfo:
+        run(main())
+    group = excinfo.value
+    assert group.message == "failed"
+    assert group.exceptions == (error1, error2)
+    assert group.sources == ("first", "second")
+    assert finished == [True]
+
+
+def test_task_group_fail_fast():
+    error = ValueError("boom")
+    finished = []
+
+    async def slow():
+        await asyncio.sleep(1)
+        finished.append(True)
+
+    async def main():
+        async with TaskGroup(fail_fast=True) as tg:
+            tg.create_task(slow(), name="slow")
+            tg.create_task(fail(error), name="failing")
+
+    with pytest.raises(ExceptionGroup) as excinfo:
+        run(main())
+    assert excinfo.value.exceptions == (error,)
+    assert excinfo.value.sources == ("failing",)
+    assert finished == []
+
+
+def test_task_group_fail_fast_cancels_body():
+    error = ValueError("boom")
+    body_cancelled = []
+
+    async def main():
+        async with TaskGroup(fail_fast=True) as tg:
+            tg.create_task(fail(error), name="failing")
+            try:
+                await asyncio.sleep(2)
+            except asyncio.CancelledError:
+                body_cancelled.append(True)
+                raise
+
+    loop = asyncio.new_event_loop()
+    try:
+        start = loop.time()
+        with pytest.raises(ExceptionGroup) as excinfo:
+            loop.run_until_complete(main())
+        assert loop.time() - start < 1
+    finally:
+        loop.close()
+    assert excinfo.value.exceptions == (error,)
+    assert excinfo.value.sources == ("failing",)
+    assert excinfo.value.__context__ is None
+    assert body_cancelled == [True]
+
+    # a body that swallows the cancellation still gets the group raised,
+    # and the cancellation doesn't linger
+    async def stubborn():
+        async with TaskGroup(fail_fast=True) as tg:
+            tg.create_task(fail(error), name="failing")
+            try:
+                await asyncio.sleep(2)
+            except asyncio.CancelledError:
+                pass
+            body_cancelled.append(True)
+
+    async def after_stubborn():
+        with pytest.raises(ExceptionGroup):
+            await stubborn()
+        await asyncio.sleep(0.01)
+        return "done"
+
+    assert run(after_stubborn()) == "done"
+    assert body_cancelled == [True, True]
+
+
+def test_task_group_body_error():
+    error = RuntimeError("body")
+
+    async def main():
+        async with TaskGroup() as tg:
+            tg.create_task(succeed(1))
+            raise error
+
+    with pytest.raises(ExceptionGroup) as excinfo:
+        run(main())
+    group = excinfo.value
+    assert group.exceptions == (error,)
+    assert group.sources == ("task group body",)
+    assert group.__context__ is None
+
+
+def test_task_group_outer_cancel():
+    cancelled = []
+
+    async def slow():
+        try:
+            await asyncio.sleep(1)
+        except asyncio.CancelledError:
+            cancelled.append(True)
+            raise
+
+    async def body():
+        async with TaskGroup() as tg:
+            tg.create_task(slow())
+
+    async def main():
+        task = asyncio.ensure_future(body())
+        await asyncio.sleep(0.01)
+        task.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await task
+
+    run(main())
+    assert cancelled == [True]
+
+
+def test_gather_group():
+    error = ValueError("x")
+
+    async def ok():
+        return await gather_group(succeed(1, 0.01), succeed(2))
+
+    assert run(ok()) == [1, 2]
+
+    async def bad():
+        return await gather_group(succeed(1), fail(error), names=["a", "b"])
+
+    with pytest.raises(ExceptionGroup) as excinfo:
+        run(bad())
+    assert excinfo.value.exceptions == (error,)
+    assert excinfo.value.sources == ("b",)
+
+    coro = succeed(1)
+    with pytest.raises(ValueError):
+        run(gather_group(coro, names=[]))
+    coro.close()
+
+
+def test_acatch():
+    caught = []
+
+    async def handler(exc):
+        await asyncio.sleep(0)
+        caught.append(exc)
+
+    error1 = ValueError("a")
+    error2 = KeyError("b")
+    group = ExceptionGroup("many", [error1, error2], ["a", "b"])
+
+    async def main():
+        async with acatch(ValueError, handler):
+            raise group
+
+    with pytest.raises(ExceptionGroup) as excinfo:
+        run(main())
+    assert excinfo.value.exceptions == (error2,)
+    assert len(caught) == 1
+    assert caught[0].exceptions == (error1,)
+
+    # plain handlers work too, and everything caught means nothing is raised
+    async def all_caught():
+        async with acatch(ValueError, caught.append):
+            raise error1
+
+    run(all_caught())
+    assert caught[-1] is error1
+
+    async def nothing():
+        async with acatch(ValueError, handler):
+            pass
+
+    run(nothing())
+
+
+def test_acatch_handler_raises():
+    new_error = RuntimeError("new")
+
+    async def handler(exc):
+        raise new_error
+
+    async def main():
+        async with acatch(ValueError, handler):
+            raise ValueError("original")
+
+    with pytest.raises(RuntimeError) as excinfo:
+        run(main())
+    assert excinfo.value is new_error
+    assert isinstance(new_error.__context__, ValueError)
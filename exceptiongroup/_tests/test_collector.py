@@ -0,0 +1,131 @@
+import threading
+
+import pytest
+
+from exceptiongroup import (
+    AggregatedSources,
+    ExceptionGroup,
+    ExceptionGroupCollector,
+)
+from ._common import raise_value_error
+
+
+def test_collector_build():
+    collector = ExceptionGroupCollector("many error.")
+    memberA = ValueError("A")
+    memberB = RuntimeError("B")
+    collector.add(memberA, "A")
+    collector.add(memberB, "B")
+    assert len(collector) == 2
+    assert collector.dropped == 0
+
+    group = collector.build()
+    assert type(group) is ExceptionGroup
+    assert group.message == "many error."
+    assert group.exceptions == (memberA, memberB)
+    assert group.sources == ("A", "B")
+
+    # the collector starts over, without touching the built group
+    assert len(collector) == 0
+    assert collector.build() is None
+    collector.add(ValueError("C"), "C")
+    assert group.exceptions == (memberA, memberB)
+
+
+def test_collector_rejects_non_exceptions():
+    collector = ExceptionGroupCollector("many error.")
+    with pytest.raises(TypeError):
+        collector.add("error", "source")
+    with pytest.raises(ValueError):
+        ExceptionGroupCollector("many error.", max_exceptions=-1)
+
+
+def test_collector_drops_exceptions_past_the_limit():
+    collector = ExceptionGroupCollector("many error.", max_exceptions=2)
+    errors = [ValueError(i) for i in range(5)]
+    for i, error in enumerate(errors):
+        collector.add(error, str(i))
+    assert len(collector) == 2
+    assert collector.dropped == 3
+
+    group = collector.build()
+    assert group.exceptions == tuple(errors[:2])
+    assert group.sources == ("0", "1")
+    assert group.message == "many error. (3 more exceptions were dropped)"
+    assert collector.dropped == 0
+
+
+def test_collector_intern_sources():
+    collector = ExceptionGroupCollector("many error.", intern_sources=True)
+    for _ in range(2):
+        collector.add(ValueError(), "worker task {}".format(1))
+    group = collector.build()
+    assert group.sources[0] is group.sources[1]
+
+
+def test_collector_from_many_threads():
+    collector = ExceptionGroupCollector("many error.", max_exceptions=1000)
+
+    def worker(n):
+        for i in range(200):
+            collector.add(ValueError(n, i), "worker {}".format(n))
+
+    threads = [threading.Thread(target=worker, args=(n,)) for n in range(10)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert len(collector) == 1000
+    assert collector.dropped == 1000
+    group = collector.build()
+    assert len(group.exceptions) == len(group.sources) == 1000
+    for exc, source in zip(group.exceptions, group.sources):
+        assert source == "worker {}".format(exc.args[0])
+
+
+def test_collector_aggregate():
+    collector = ExceptionGroupCollector(
+        "many error.", max_exceptions=2, aggregate=True
+    )
+    error = ValueError("down")
+    for i in range(5):
+        collector.add(error, "task {}".format(i))
+    collector.add(RuntimeError("other"), "task 5")
+    collector.add(KeyError("dropped"), "task 6")
+    # folded exceptions don't count towards the limit
+    collector.add(error, "task 7")
+    assert len(collector) == 2
+    assert collector.dropped == 1
+
+    group = collector.build()
+    assert group.exceptions == (error, group.exceptions[1])
+    assert group.sources[0] == tuple(
+        "task {}".format(i) for i in [0, 1, 2, 3, 4, 7]
+    )
+    assert isinstance(group.sources[0], AggregatedSources)
+    assert group.sources[1] == "task 5"
+
+
+def raise_value_error_elsewhere(value):
+    try:
+        raise ValueError(value)
+    except ValueError as e:
+        return e
+
+
+def test_collector_compact():
+    collector = ExceptionGroupCollector(
+        "many error.", compact=True, aggregate=True
+    )
+    for i in range(3):
+        collector.add(raise_value_error("down"), "a {}".format(i))
+    collector.add(raise_value_error_elsewhere("down"), "b")
+    group = collector.build()
+    for exc in group.exceptions:
+        assert exc.__traceback__ is None
+    assert group.exceptions[0].__traceback_summary__[-1][2] == (
+        "raise_value_error"
+    )
+    # exceptions raised from the same place still fold, and others don't
+    assert group.sources == (("a 0", "a 1", "a 2"), "b")
@@ -1,7 +1,12 @@
 import copy
+import gc
+import pickle
+import weakref
+
 import pytest
 
-from exceptiongroup import ExceptionGroup
+from exceptiongroup import ExceptionGroup, AggregatedSources, split, partition
+from ._common import raise_value_error
 
 
 def raise_group():
@@ -17,13 +22,13 @@ def test_exception_group_init():
     group = ExceptionGroup(
         "many error.", [memberA, memberB], [str(memberA), str(memberB)]
     )
-    assert group.exceptions == [memberA, memberB]
+    assert group.exceptions == (memberA, memberB)
     assert group.message == "many error."
-    assert group.sources == [str(memberA), str(memberB)]
+    assert group.sources == (str(memberA), str(memberB))
     assert group.args == (
         "many error.",
-        [memberA, memberB],
-        [str(memberA), str(memberB)],
+        (memberA, memberB),
+        (str(memberA), str(memberB)),
     )
 
 
@@ -82,3 +87,258 @@ def test_exception_group_copy():
     assert another_group.__context__ is group.__context__
     assert another_group.__suppress_context__ is group.__suppress_context__
     assert another_group.__suppress_context__ is False
+
+
+class ExtraGroup(ExceptionGroup):
+    def __init__(self, message, exceptions, sources, extra):
+        super().__init__(message, exceptions, sources)
+        self.extra = extra
+
+
+def test_exception_group_subclass_attributes_are_kept():
+    group = ExtraGroup("many error.", [ValueError(), KeyError()], "vk", 1)
+    matched, unmatched = split(ValueError, group)
+    parts, _ = partition({KeyError: None}, group)
+    for derived in [matched, unmatched, parts[KeyError], copy.copy(group)]:
+        assert type(derived) is ExtraGroup
+        assert derived.extra == 1
+
+
+def test_exception_group_init_from_iterables():
+    memberA = ValueError("A")
+    memberB = RuntimeError("B")
+    group = ExceptionGroup(
+        "many error.", (exc for exc in [memberA, memberB]), iter(["A", "B"]),
+    )
+    assert group.exceptions == (memberA, memberB)
+    assert group.sources == ("A", "B")
+    assert group.args == ("many error.", (memberA, memberB), ("A", "B"))
+
+    with pytest.raises(TypeError):
+        ExceptionGroup("error", (exc for exc in [memberA, "B"]), ["A", "B"])
+
+
+def test_exception_group_from_validated():
+    memberA = ValueError("A")
+    exceptions = (memberA,)
+    sources = ("A",)
+    group = ExceptionGroup._from_validated("many error.", exceptions, sources)
+    assert type(group) is ExceptionGroup
+    assert group.exceptions is exceptions
+    assert group.sources is sources
+    assert group.message == "many error."
+    assert group.args == ("many error.", exceptions, sources)
+
+    group = ExceptionGroup._from_validated("many error.", [memberA], ["A"])
+    assert group.exceptions == (memberA,)
+    assert group.sources == ("A",)
+    assert group.__traceback__ is None
+    assert group.__cause__ is None
+    assert group.__context__ is None
+
+
+def test_exception_group_stores_children_only_in_args():
+    memberA = ValueError("A")
+    group = ExceptionGroup("many error.", [memberA], ["A"])
+    assert group.exceptions is group.args[1]
+    assert group.sources is group.args[2]
+    assert vars(group) == {}
+
+    memberB = RuntimeError("B")
+    group.exceptions = [memberB]
+    group.sources = ["B"]
+    group.message = "other error."
+    assert group.args == ("other error.", (memberB,), ("B",))
+
+
+def test_exception_group_intern_sources():
+    memberA = ValueError("A")
+    memberB = ValueError("B")
+    sources = ["worker task {}".format(i) for i in [1, 1]]
+    assert sources[0] is not sources[1]
+    group = ExceptionGroup(
+        "many error.", [memberA, memberB], sources, intern_sources=True
+    )
+    assert group.sources == tuple(sources)
+    assert group.sources[0] is group.sources[1]
+
+
+def test_exception_group_pickle():
+    group = ExceptionGroup("many error.", [ValueError("A")], ["A"])
+    new_group = pickle.loads(pickle.dumps(group))
+    assert type(new_group) is ExceptionGroup
+    assert new_group.message == "many error."
+    assert repr(new_group.exceptions) == repr(group.exceptions)
+    assert new_group.sources == ("A",)
+
+
+def test_exception_group_unpickling_keeps_leaf_indexes():
+    data = pickle.dumps(
+        ExceptionGroup(
+            "many error.",
+            [ExceptionGroup("inner", [KeyError()], ["k"])],
+            ["inner"],
+        )
+    )
+    generation = ExceptionGroup._exceptions_generation
+    new_group = pickle.loads(data)
+    assert ExceptionGroup._exceptions_generation == generation
+    assert split(KeyError, new_group) == (new_group, None)
+    assert new_group.exceptions[0].exceptions[0].__class__ is KeyError
+
+
+def test_exception_group_pickle_keeps_tracebacks_and_chaining():
+    try:
+        raise_group()
+    except ExceptionGroup as e:
+        group = e
+    inner = ExceptionGroup("inner", [group, group.exceptions[0]], ["g", "z"])
+    inner.__context__ = group
+    inner.extra = "attribute"
+    outer = ExceptionGroup("outer", [inner, KeyError("k")], ["i", "k"])
+    # a cycle through __context__
+    outer.exceptions[1].__context__ = outer
+
+    new_outer = pickle.loads(pickle.dumps(outer))
+    new_inner, new_key_error = new_outer.exceptions
+    new_group, new_zero = new_inner.exceptions
+    assert new_inner.extra == "attribute"
+    assert new_key_error.__context__ is new_outer
+    # shared exceptions stay shared
+    assert new_inner.__context__ is new_group
+    assert new_group.exceptions[0] is new_zero
+    assert new_group.__cause__ is new_zero
+    assert new_group.__suppress_context__
+    assert isinstance(new_zero, ZeroDivisionError)
+
+    # tracebacks become summaries
+    assert new_group.__traceback__ is None
+    frames = new_group.__traceback_summary__
+    assert [frame[2] for frame in frames] == [
+        "test_exception_group_pickle_keeps_tracebacks_and_chaining",
+        "raise_group",
+    ]
+    assert frames[-1][3] == (
+        'raise ExceptionGroup("ManyError", [e], [str(e)]) from e'
+    )
+    assert new_zero.__traceback_summary__[-1][3] == "1 / 0"
+    assert not hasattr(new_key_error, "__traceback_summary__")
+
+    # and survive another round trip
+    again = pickle.loads(pickle.dumps(new_outer))
+    assert again.exceptions[0].exceptions[0].__traceback_summary__ == frames
+
+
+def test_exception_group_pickle_shares_exceptions():
+    error = ValueError("x" * 1000)
+    group = ExceptionGroup("many", [error] * 100, list(range(100)))
+    data = pickle.dumps(group)
+    assert len(data) < 2000
+    new_group = pickle.loads(data)
+    assert all(exc is new_group.exceptions[0] for exc in new_group.exceptions)
+
+
+def test_exception_group_aggregate():
+    errors = [raise_value_error("down") for _ in range(5)]
+    other = raise_value_error("other")
+    group = ExceptionGroup(
+        "many error.",
+        errors + [other],
+        ["task {}".format(i) for i in range(6)],
+    )
+    aggregated = group.aggregate()
+    assert aggregated is not group
+    assert aggregated.exceptions == (errors[0], other)
+    assert aggregated.sources[1] == "task 5"
+    folded = aggregated.sources[0]
+    assert isinstance(folded, AggregatedSources)
+    assert folded == tuple("task {}".format(i) for i in range(5))
+    assert folded.count == 5
+    assert str(folded) == (
+        "5 identical exceptions from task 0, task 1, task 2, ... (2 more)"
+    )
+
+    # aggregating again merges with the existing AggregatedSources
+    again = ExceptionGroup(
+        "many error.",
+        aggregated.exceptions + (errors[1],),
+        aggregated.sources + ("task 6",),
+    ).aggregate()
+    assert again.sources[0].count == 6
+
+
+def test_exception_group_aggregate_nested():
+    errors = [raise_value_error("down") for _ in range(2)]
+    inner = ExceptionGroup("inner", errors, ["a", "b"])
+    unchanged = ExceptionGroup("unchanged", [errors[0]], ["c"])
+    group = ExceptionGroup(
+        "outer", [inner, unchanged, errors[1]], ["inner", "unchanged", "d"]
+    )
+    aggregated = group.aggregate()
+    assert aggregated.sources == ("inner", "unchanged", "d")
+    assert aggregated.exceptions[0].exceptions == (errors[0],)
+    assert aggregated.exceptions[0].sources == (("a", "b"),)
+    assert aggregated.exceptions[1] is unchanged
+    assert aggregated.exceptions[2] is errors[1]
+
+
+def test_exception_group_aggregate_keeps_distinct_exceptions():
+    def raise_elsewhere():
+        try:
+            raise ValueError("down")
+        except ValueError as e:
+            return e
+
+    errors = [
+        raise_value_error("down"),
+        raise_value_error("up"),
+        raise_elsewhere(),
+        RuntimeError("down"),
+        ValueError(["unhashable"]),
+        ValueError(["unhashable"]),
+    ]
+    group = ExceptionGroup("many error.", errors, list("abcdef"))
+    assert group.aggregate() is group
+
+
+class Payload:
+    pass
+
+
+def raise_with_local(payload_refs):
+    payload = Payload()
+    payload_refs.append(weakref.ref(payload))
+    try:
+        raise ValueError("with local")
+    except ValueError as e:
+        return e
+
+
+def test_exception_group_compact():
+    payload_refs = []
+    leaf = raise_with_local(payload_refs)
+    leaf.__cause__ = raise_with_local(payload_refs)
+    inner = ExceptionGroup("inner", [leaf], ["leaf"])
+    try:
+        raise_group()
+    except ExceptionGroup as e:
+        raised = e
+    group = ExceptionGroup("outer", [inner, leaf, raised], ["i", "l", "r"])
+
+    assert group.compact() is group
+    gc.collect()
+    assert [ref() for ref in payload_refs] == [None, None]
+    for exc in [leaf, leaf.__cause__, raised, raised.exceptions[0]]:
+        assert exc.__traceback__ is None
+        assert exc.__traceback_summary__
+    assert leaf.__traceback_summary__[-1][2:] == (
+        "raise_with_local",
+        'raise ValueError("with local")',
+    )
+    assert raised.exceptions[0].__traceback_summary__[-1][3] == "1 / 0"
+    # exceptions that never had a traceback are left alone
+    assert not hasattr(group, "__traceback_summary__")
+    # compacting twice changes nothing
+    summary = leaf.__traceback_summary__
+    group.compact()
+    assert leaf.__traceback_summary__ is summary
@@ -0,0 +1,122 @@
+import io
+import json
+import pickle
+
+from exceptiongroup import (
+    ExceptionGroup,
+    export_events,
+    export_json_lines,
+    export_tree,
+)
+from ._common import raise_value_error
+
+
+def raise_from(error, cause):
+    try:
+        raise error from cause
+    except BaseException as e:
+        return e
+
+
+def test_export_events():
+    shared = raise_value_error("shared")
+    error = raise_from(RuntimeError("runtime"), shared)
+    inner = ExceptionGroup("inner", [shared], ["shared again"])
+    group = ExceptionGroup("outer", [error, inner], ["runtime", "inner"])
+
+    events = list(export_events(group))
+    assert len(events) == 4
+    by_id = {event["id"]: event for event in events}
+    root = events[0]
+    assert root["id"] == 0
+    assert root["type"] == "exceptiongroup.ExceptionGroup"
+    assert root["message"] == "outer"
+    assert root["frames"] == []
+    assert root["cause"] is None
+    assert [child["source"] for child in root["exceptions"]] == [
+        "runtime",
+        "inner",
+    ]
+
+    error_event = by_id[root["exceptions"][0]["id"]]
+    assert error_event["type"] == "RuntimeError"
+    assert error_event["message"] == "runtime"
+    assert error_event["suppress_context"] is True
+    assert "exceptions" not in error_event
+    (frame,) = error_event["frames"]
+    assert frame["name"] == "raise_from"
+    assert frame["line"] == "raise error from cause"
+
+    inner_event = by_id[root["exceptions"][1]["id"]]
+    shared_id = inner_event["exceptions"][0]["id"]
+    assert error_event["cause"] == shared_id
+    assert error_event["context"] is None
+    assert by_id[shared_id]["message"] == "shared"
+
+    # every event comes after the first reference to it
+    seen = {0}
+    for event in events:
+        assert event["id"] in seen
+        seen.update(
+            linked
+            for linked in [event["cause"], event["context"]]
+            + [child["id"] for child in event.get("exceptions", [])]
+            if linked is not None
+        )
+
+
+def test_export_events_without_lines():
+    error = raise_value_error("A")
+    (event,) = export_events(error, lookup_lines=False)
+    assert event["frames"][0]["line"] is None
+
+
+def test_export_events_of_unpickled_group():
+    group = ExceptionGroup("many error.", [raise_value_error("A")], ["a"])
+    expected = list(export_events(group))
+    assert list(export_events(pickle.loads(pickle.dumps(group)))) == expected
+
+
+def test_export_events_handles_cycles():
+    error = raise_value_error("A")
+    group = ExceptionGroup("many error.", [error], ["a"])
+    error.__context__ = group
+    events = list(export_events(group))
+    assert len(events) == 2
+    assert events[1]["context"] == 0
+
+
+def test_export_tree():
+    shared = raise_value_error("shared")
+    group = ExceptionGroup(
+        "outer",
+        [shared, ExceptionGroup("inner", [shared], ["again"])],
+        ["first", "inner"],
+    )
+    tree = export_tree(group)
+    assert tree["message"] == "outer"
+    first, inner = tree["exceptions"]
+    assert first["source"] == "first"
+    assert first["exception"]["message"] == "shared"
+    assert first["exception"]["context"] is None
+    assert inner["exception"]["exceptions"] == [
+        {"source": "again", "exception": {"ref": first["exception"]["id"]}}
+    ]
+    json.dumps(tree)
+
+
+def test_export_aggregated_sources():
+    errors = [raise_value_error("down") for _ in range(3)]
+    group = ExceptionGroup("many error.", errors, ["a", "b", "c"]).aggregate()
+    (child,) = next(export_events(group))["exceptions"]
+    assert child["source"] == ["a", "b", "c"]
+
+
+def test_export_json_lines():
+    group = ExceptionGroup(
+        "many error.", [raise_value_error("A"), KeyError("B")], ["a", "b"]
+    )
+    file = io.StringIO()
+    export_json_lines(group, file)
+    lines = file.getvalue().splitlines()
+    assert [json.loads(line) for line in lines] == list(export_events(group))
@@ -0,0 +1,105 @@
+import concurrent.futures
+import itertools
+import threading
+
+import pytest
+
+from exceptiongroup import ExceptionGroup, run_all, as_completed_group
+
+
+def check_even(n):
+    if n % 2:
+        raise ValueError(n)
+    return n * 10
+
+
+@pytest.mark.parametrize("chunksize", [1, 3])
+def test_run_all_threads(chunksize):
+    with concurrent.futures.ThreadPoolExecutor(4) as executor:
+        results = {}
+        with pytest.raises(ExceptionGroup) as excinfo:
+            for item, result in run_all(
+                executor, check_even, range(10), chunksize=chunksize
+            ):
+                results[item] = result
+    assert results == {n: n * 10 for n in range(0, 10, 2)}
+    group = excinfo.value
+    assert group.message == "errors in run_all"
+    assert sorted(group.sources) == ["1", "3", "5", "7", "9"]
+    for exc, source in zip(group.exceptions, group.sources):
+        assert isinstance(exc, ValueError)
+        assert str(exc) == source
+
+
+def test_run_all_processes():
+    with concurrent.futures.ProcessPoolExecutor(2) as executor:
+        outcomes = run_all(
+            executor,
+            check_even,
+            [2, 3, 4],
+            chunksize=2,
+            describe="item {}".format,
+        )
+        results = []
+        with pytest.raises(ExceptionGroup) as excinfo:
+            for item, result in outcomes:
+                results.append(result)
+    assert sorted(results) == [20, 40]
+    assert excinfo.value.sources == ("item 3",)
+    assert str(excinfo.value.exceptions[0]) == "3"
+
+
+def test_run_all_success_and_bounds():
+    lock = threading.Lock()
+    running = [0, 0]  # current, highest
+
+    def work(n):
+        with lock:
+            running[0] += 1
+            running[1] = max(running)
+        try:
+            return n
+        finally:
+            with lock:
+                running[0] -= 1
+
+    with concurrent.futures.ThreadPoolExecutor(8) as executor:
+        results = run_all(executor, work, range(100), max_in_flight=2)
+        assert sorted(result for _, result in results) == list(range(100))
+        assert running[1] <= 2
+
+        # items are pulled lazily, so infinite iterables are fine
+        outcomes = run_all(executor, work, itertools.count())
+        assert next(outcomes)[1] in range(100)
+        outcomes.close()
+
+        # bad arguments are rejected at the call, not the first next()
+        with pytest.raises(ValueError):
+            run_all(executor, work, range(3), chunksize=0)
+        with pytest.raises(ValueError):
+            run_all(executor, work, range(3), max_in_flight=0)
+
+
+def test_as_completed_group():
+    with concurrent.futures.ThreadPoolExecutor(2) as executor:
+        futures = {executor.submit(check_even, n): n for n in range(4)}
+        results = {}
+        with pytest.raises(ExceptionGroup) as excinfo:
+            for item, result in as_completed_group(futures):
+                results[item] = result
+        assert results == {0: 0, 2: 20}
+        assert sorted(excinfo.value.sources) == ["1", "3"]
+
+        futures = {executor.submit(check_even, n): n for n in range(4)}
+        with pytest.raises(ExceptionGroup) as excinfo:
+            list(as_completed_group(futures, describe="item {}".format))
+        assert sorted(excinfo.value.sources) == ["item 1", "item 3"]
+
+        futures = [executor.submit(check_even, n) for n in (1, 2)]
+        with pytest.raises(ExceptionGroup) as excinfo:
+            list(as_completed_group(futures, message="failed"))
+        assert excinfo.value.message == "failed"
+        assert excinfo.value.sources == ("future 0",)
+
+        futures = [executor.submit(check_even, 2)]
+        assert list(as_completed_group(futures)) == [("future 0", 20)]
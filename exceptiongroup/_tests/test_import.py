@@ -0,0 +1,71 @@
+import os
+import subprocess
+import sys
+
+CHECK_PATCHED = """
+import sys, traceback
+original = traceback.TracebackException.__init__
+import exceptiongroup
+print(traceback.TracebackException.__init__ is not original)
+print(sys.excepthook is not sys.__excepthook__)
+exceptiongroup.ExceptionGroup("many error.", [], [])
+print(traceback.TracebackException.__init__ is not original)
+print(sys.excepthook is not sys.__excepthook__)
+"""
+
+
+def run_python(args, env=None):
+    return subprocess.run(
+        [sys.executable] + args,
+        stdout=subprocess.PIPE,
+        stderr=subprocess.PIPE,
+        universal_newlines=True,
+        env=env,
+        check=True,
+    )
+
+
+def test_import_time():
+    result = run_python(["-X", "importtime", "-c", "import exceptiongroup"])
+    # lines look like "import time: self [us] | cumulative | imported package"
+    times = {}
+    for line in result.stderr.splitlines()[1:]:
+        _, cumulative, name = line.split("|")
+        times[name.strip()] = int(cumulative)
+    assert "exceptiongroup" in times
+    # slow modules that are only needed for some features
+    for module in ["asyncio", "concurrent.futures", "IPython"]:
+        assert module not in times
+
+
+def test_patches_installed_on_first_use():
+    env = dict(os.environ)
+    env.pop("EXCEPTIONGROUP_NO_PATCH", None)
+    result = run_python(["-c", CHECK_PATCHED], env=env)
+    assert result.stdout.split() == ["False", "False", "True", "True"]
+
+
+def test_patches_disabled_by_environment():
+    env = dict(os.environ, EXCEPTIONGROUP_NO_PATCH="1")
+    result = run_python(["-c", CHECK_PATCHED], env=env)
+    assert result.stdout.split() == ["False", "False", "False", "False"]
+
+
+CHECK_WARNINGS = """
+import sys, warnings
+sys.excepthook = lambda *args: None
+import exceptiongroup
+exceptiongroup.ExceptionGroup("many error.", [], [])
+print("created")
+try:
+    exceptiongroup.install()
+except RuntimeWarning:
+    print("warned")
+"""
+
+
+def test_custom_excepthook_warns_only_on_explicit_install():
+    env = dict(os.environ)
+    env.pop("EXCEPTIONGROUP_NO_PATCH", None)
+    result = run_python(["-W", "error", "-c", CHECK_WARNINGS], env=env)
+    assert result.stdout.split() == ["created", "warned"]
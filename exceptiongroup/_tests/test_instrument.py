@@ -0,0 +1,94 @@
+import pytest
+
+from exceptiongroup import (
+    ExceptionGroup,
+    InstrumentationCounters,
+    add_instrumentation_hook,
+    catch,
+    partition,
+    remove_instrumentation_hook,
+    split,
+)
+from exceptiongroup import _instrument
+
+
+@pytest.fixture
+def events():
+    events = []
+    add_instrumentation_hook(events.append)
+    yield events
+    remove_instrumentation_hook(events.append)
+
+
+def nested_group():
+    inner = ExceptionGroup("inner", [KeyError(), ValueError()], ["k", "v"])
+    return ExceptionGroup("outer", [inner, ValueError()], ["inner", "v"])
+
+
+def test_split_and_partition_events(events):
+    group = nested_group()
+    split(ValueError, group)
+    partition({KeyError: None}, group)
+    assert [event["event"] for event in events] == ["split", "partition"]
+    for event in events:
+        assert event["nodes"] == 5
+        assert event["depth"] == 2
+        assert event["elapsed"] >= 0
+
+
+def test_catch_events(events):
+    def handler(exc):
+        pass
+
+    with catch(ValueError, handler):
+        raise ValueError
+    with pytest.raises(KeyError):
+        with catch(ValueError, handler):
+            raise KeyError
+    with catch(ValueError, handler):
+        pass
+
+    assert [event["event"] for event in events] == ["catch", "catch"]
+    assert [event["handled"] for event in events] == [True, False]
+    assert events[0]["handler"].endswith("test_catch_events.<locals>.handler")
+    assert (events[0]["nodes"], events[0]["depth"]) == (1, 0)
+
+
+def test_no_events_when_disabled():
+    assert _instrument.hooks == []
+    events = []
+    hook = add_instrumentation_hook(events.append)
+    assert hook == events.append
+    remove_instrumentation_hook(events.append)
+    split(ValueError, nested_group())
+    assert events == []
+    with pytest.raises(ValueError):
+        remove_instrumentation_hook(events.append)
+
+
+def test_counters():
+    counters = add_instrumentation_hook(InstrumentationCounters())
+    try:
+
+        def handler(exc):
+            pass
+
+        group = nested_group()
+        split(ValueError, group)
+        split(KeyError, group)
+        with catch(KeyError, handler):
+            raise KeyError
+    finally:
+        remove_instrumentation_hook(counters)
+
+    totals = counters.as_dict()
+    assert list(totals["events"]) == ["split", "catch"]
+    split_totals = totals["events"]["split"]
+    assert split_totals["count"] == 2
+    assert split_totals["nodes"] == 10
+    assert split_totals["max_depth"] == 2
+    assert split_totals["max_elapsed"] <= split_totals["elapsed"]
+    assert list(totals["handlers"].values()) == [1]
+
+    counters.reset()
+    assert counters.as_dict() == {"events": {}, "handlers": {}}
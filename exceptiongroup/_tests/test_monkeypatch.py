@@ -0,0 +1,426 @@
+import io
+import os
+import pickle
+import sys
+import textwrap
+import traceback
+
+import pytest
+
+from exceptiongroup import (
+    ExceptionGroup,
+    add_instrumentation_hook,
+    install,
+    print_exception_group,
+    remove_instrumentation_hook,
+    set_traceback_limits,
+    uninstall,
+)
+from exceptiongroup import _monkeypatch
+from ._common import raise_value_error
+from .test_import import CHECK_PATCHED, run_python
+
+
+def format_group(group):
+    return "".join(
+        traceback.format_exception(type(group), group, group.__traceback__)
+    )
+
+
+def test_format_aggregated_group():
+    errors = [raise_value_error("down") for _ in range(5)]
+    group = ExceptionGroup(
+        "many error.", errors, ["task {}".format(i) for i in range(5)]
+    )
+    output = format_group(group.aggregate())
+    assert output.count("ValueError: down") == 1
+    assert (
+        "5 identical exceptions from task 0, task 1, task 2, ... (2 more):"
+        in output
+    )
+
+
+def test_format_unpickled_group():
+    try:
+        try:
+            raise raise_value_error("first")
+        except ValueError as e:
+            raise ExceptionGroup(
+                "many error.", [e, raise_value_error("second")], ["a", "b"]
+            ) from KeyError("cause")
+    except ExceptionGroup as e:
+        group = e
+    expected = format_group(group)
+    new_group = pickle.loads(pickle.dumps(group))
+    assert new_group.__traceback__ is None
+    assert format_group(new_group) == expected
+
+
+def test_format_compacted_group():
+    try:
+        try:
+            raise raise_value_error("first")
+        except ValueError as e:
+            raise ExceptionGroup(
+                "many error.", [e, raise_value_error("second")], ["a", "b"]
+            )
+    except ExceptionGroup as e:
+        group = e
+    expected = format_group(group)
+    group.compact()
+    assert format_group(group) == expected
+
+
+def test_prefetched_source_lines(monkeypatch):
+    try:
+        try:
+            raise_in_depth(3)
+        except ValueError as e:
+            raise ExceptionGroup(
+                "many error.",
+                [
+                    e,
+                    raise_value_error("second"),
+                    ExceptionGroup("nested", [KeyError("plain")], ["c"]),
+                ],
+                ["a", "b", "nested"],
+            ) from raise_value_error("cause")
+    except ExceptionGroup as e:
+        group = e
+    outputs = []
+    for prefetch in [True, False]:
+        monkeypatch.setattr(_monkeypatch, "prefetch_source_lines", prefetch)
+        outputs.append(
+            [
+                "".join(
+                    traceback.format_exception(
+                        type(group), group, group.__traceback__, limit
+                    )
+                )
+                for limit in [None, 2, -1]
+            ]
+        )
+    assert outputs[0] == outputs[1]
+    assert "raise_in_depth(depth - 1)" in outputs[0][0]
+
+
+def format_with_textwrap(te):
+    # how nested groups used to be formatted: each level indenting the
+    # already indented lines of the level below
+    yield from _monkeypatch.traceback_exception_original_format(te)
+    for exc, source in zip(te.exceptions, te.sources):
+        yield "\n  {}:\n\n".format(source)
+        for line in format_with_textwrap(exc):
+            yield textwrap.indent(line, " " * 4)
+
+
+def test_nested_indentation():
+    group = ExceptionGroup(
+        "leaf", [raise_value_error("a\n\n  \nb"), KeyError()], ["x\ny", "z"]
+    )
+    for i in range(5):
+        group = ExceptionGroup(
+            "level\n{}".format(i),
+            [group, raise_value_error(i)],
+            ["inner", "leaf"],
+        )
+    try:
+        raise group
+    except ExceptionGroup as e:
+        te = traceback.TracebackException.from_exception(e)
+    expected = "".join(format_with_textwrap(te))
+    assert "".join(te.format()) == expected
+    assert " " * 24 + "ValueError: a\n\n  \n" + " " * 24 + "b\n" in expected
+
+
+@pytest.fixture
+def traceback_limits():
+    yield set_traceback_limits
+    set_traceback_limits()
+
+
+def raise_in_depth(depth):
+    if depth == 0:
+        raise ValueError("deep")
+    raise_in_depth(depth - 1)
+
+
+def test_children_are_captured_lazily():
+    group = ExceptionGroup(
+        "many error.",
+        [raise_value_error("A"), raise_value_error("B")],
+        ["a", "b"],
+    )
+    te = traceback.TracebackException.from_exception(group)
+    assert te._pending_children is not None
+    output = "".join(te.format())
+    assert te._pending_children is None
+    assert [str(child) for child in te.exceptions] == ["A", "B"]
+    assert te.sources == ["a", "b"]
+    assert "ValueError: A" in output
+    assert "ValueError: B" in output
+
+
+def test_max_children(traceback_limits):
+    traceback_limits(max_children=2)
+    errors = [raise_value_error(i) for i in range(5)]
+    group = ExceptionGroup("many error.", errors, list("abcde"))
+    output = format_group(group)
+    assert "ValueError: 1" in output
+    assert "ValueError: 2" not in output
+    assert output.endswith("\n  ... 3 more exceptions not shown\n")
+
+
+def test_max_children_limits_output_size(traceback_limits):
+    inner = ExceptionGroup(
+        "inner", [ValueError(i) for i in range(10000)], range(10000)
+    )
+    group = ExceptionGroup(
+        "many error.",
+        [inner] + [KeyError(i) for i in range(10000)],
+        range(10001),
+    )
+    traceback_limits(max_children=2)
+    output = format_group(group)
+    assert len(output) < 1000
+    assert output.startswith(
+        "exceptiongroup.ExceptionGroup: <ExceptionGroup: ValueError(0), "
+        "ValueError(1), ... (9998 more)>, KeyError(0), ... (9999 more)\n"
+    )
+    assert output.endswith("\n  ... 9999 more exceptions not shown\n")
+
+
+def test_max_depth(traceback_limits):
+    traceback_limits(max_depth=1)
+    inner = ExceptionGroup("inner", [raise_value_error("inner")], ["leaf"])
+    group = ExceptionGroup(
+        "outer", [inner, raise_value_error("outer")], ["nested", "direct"]
+    )
+    output = format_group(group)
+    assert "ValueError: outer" in output
+    assert "ValueError: inner" not in output
+    assert "\n      ... 1 more exceptions not shown\n" in output
+
+    traceback_limits(max_depth=0)
+    output = format_group(group)
+    assert "ValueError: " not in output
+    assert output.endswith("\n  ... 2 more exceptions not shown\n")
+
+
+def test_max_frames_per_child(traceback_limits):
+    try:
+        raise_in_depth(10)
+    except ValueError as e:
+        error = e
+    group = ExceptionGroup("many error.", [error], ["deep"])
+    assert "[Previous line repeated 7 more times]" in format_group(group)
+
+    traceback_limits(max_frames_per_child=3)
+    output = format_group(group)
+    assert "Previous line repeated" not in output
+    assert output.count("in raise_in_depth") == 2
+
+    # with a negative limit, the last frames are shown
+    output = "".join(
+        traceback.format_exception(ExceptionGroup, group, None, limit=-5)
+    )
+    assert "Previous line repeated" not in output
+    assert output.count("in raise_in_depth") == 3
+    assert "in test_max_frames_per_child" not in output
+
+    with pytest.raises(ValueError):
+        traceback_limits(max_children=-1)
+
+
+def test_duplicates_shared_between_children_are_shown():
+    shared = raise_value_error("shared")
+    errors = []
+    for name in ["A", "B"]:
+        try:
+            try:
+                raise shared
+            except ValueError:
+                raise RuntimeError(name)
+        except RuntimeError as e:
+            errors.append(e)
+    group = ExceptionGroup("many error.", errors, ["a", "b"])
+    output = format_group(group)
+    assert output.count("ValueError: shared") == 2
+    assert "RuntimeError: A" in output
+    assert "RuntimeError: B" in output
+
+
+def test_child_chained_to_its_group():
+    error = raise_value_error("child")
+    group = ExceptionGroup("many error.", [error], ["a"])
+    error.__context__ = group
+    output = format_group(group)
+    assert output.count("ValueError: child") == 1
+
+
+def test_seen_snapshot_is_not_affected_by_later_additions():
+    seen = _monkeypatch._SeenSet()
+    seen.add(1)
+    snapshot = _monkeypatch._snapshot_seen(seen)
+    seen.add(2)
+    assert 1 in seen and 2 in seen
+    assert 1 in snapshot and 2 not in snapshot
+
+    child = _monkeypatch._SeenSet(snapshot)
+    child.add(3)
+    assert 1 in child and 3 in child
+    assert 3 not in snapshot and 3 not in seen
+
+
+class RecordingFile:
+    def __init__(self):
+        self.writes = []
+
+    def write(self, text):
+        self.writes.append(text)
+
+
+def test_print_exception_group():
+    errors = [raise_value_error(i) for i in range(1000)]
+    group = ExceptionGroup("many error.", errors, list(range(1000)))
+    file = RecordingFile()
+    print_exception_group(group, file)
+    assert "".join(file.writes) == format_group(group)
+    # the output is written in several chunks, not all at once
+    assert len(file.writes) > 1
+
+
+def test_print_exception_group_with_max_bytes():
+    errors = [raise_value_error(i) for i in range(100)]
+    group = ExceptionGroup("many error.", errors, list(range(100)))
+    file = io.StringIO()
+    print_exception_group(group, file, max_bytes=3000)
+    output = file.getvalue()
+    truncated, marker = output.rsplit("\n... ", 1)
+    assert len(output.encode()) <= 3000
+    assert format_group(group).startswith(truncated)
+    assert marker == "(traceback truncated at 3000 bytes)\n"
+
+    # the marker itself is cut short if there's no room for it
+    file = io.StringIO()
+    print_exception_group(group, file, max_bytes=10)
+    assert file.getvalue() == "... (trace"
+
+    # and a traceback that fits isn't truncated, however close it comes
+    size = len(format_group(group).encode())
+    file = io.StringIO()
+    print_exception_group(group, file, max_bytes=size)
+    assert file.getvalue() == format_group(group)
+
+
+def test_print_exception_group_with_max_bytes_cuts_long_lines():
+    # the first line lists every child, so it's far too long to fit
+    group = ExceptionGroup(
+        "many error.",
+        [ValueError("\xe9" * 10) for _ in range(1000)],
+        range(1000),
+    )
+    for max_bytes in [2000, 2001]:
+        file = io.StringIO()
+        print_exception_group(group, file, max_bytes=max_bytes)
+        output = file.getvalue()
+        truncated, marker = output.rsplit("\n... ", 1)
+        assert len(output.encode()) <= max_bytes
+        assert len(output.encode()) >= max_bytes - 2
+        assert truncated.startswith("exceptiongroup.ExceptionGroup: ")
+        assert format_group(group).startswith(truncated)
+
+
+def test_excepthook_with_max_bytes(traceback_limits, capsys):
+    group = ExceptionGroup(
+        "many error.", [raise_value_error(i) for i in range(100)], range(100)
+    )
+    _monkeypatch.exceptiongroup_excepthook(ExceptionGroup, group, None)
+    assert capsys.readouterr().err == format_group(group)
+
+    traceback_limits(max_excepthook_bytes=3000)
+    _monkeypatch.exceptiongroup_excepthook(ExceptionGroup, group, None)
+    output = capsys.readouterr().err
+    assert output.endswith("\n... (traceback truncated at 3000 bytes)\n")
+    assert len(output.encode()) <= 3000
+
+
+def test_install_and_uninstall(capsys):
+    original_init = _monkeypatch.traceback_exception_original_init
+    install()
+    assert traceback.TracebackException.__init__ is not original_init
+    try:
+        uninstall()
+        assert traceback.TracebackException.__init__ is original_init
+        assert not hasattr(traceback.TracebackException, "exceptions")
+        assert sys.excepthook is sys.__excepthook__
+        # creating groups no longer installs anything
+        group = ExceptionGroup("many error.", [ValueError("A")], ["a"])
+        assert traceback.TracebackException.__init__ is original_init
+
+        # but print_exception_group still works, without leaving the patch
+        # behind
+        print_exception_group(group)
+        assert "ValueError: A" in capsys.readouterr().err
+        assert traceback.TracebackException.__init__ is original_init
+        assert sys.excepthook is sys.__excepthook__
+
+        # an uninstall() while printing takes effect once it's done
+        class UninstallingFile(io.StringIO):
+            def write(self, text):
+                uninstall()
+                assert traceback.TracebackException.__init__ is not (
+                    original_init
+                )
+                return super().write(text)
+
+        install()
+        file = UninstallingFile()
+        print_exception_group(group, file)
+        assert "ValueError: A" in file.getvalue()
+        assert traceback.TracebackException.__init__ is original_init
+    finally:
+        install()
+    assert sys.excepthook is _monkeypatch.exceptiongroup_excepthook
+    assert "ValueError: A" in format_group(group)
+
+
+def test_format_captured_before_install():
+    uninstall()
+    try:
+        te = traceback.TracebackException.from_exception(
+            raise_value_error("A")
+        )
+    finally:
+        install()
+    assert te.exceptions == []
+    assert te.sources == []
+    assert "".join(te.format()).endswith("ValueError: A\n")
+
+
+def test_print_exception_group_with_patches_disabled():
+    env = dict(os.environ, EXCEPTIONGROUP_NO_PATCH="1")
+    script = CHECK_PATCHED + (
+        "exceptiongroup.print_exception_group("
+        "exceptiongroup.ExceptionGroup('many error.', [KeyError()], ['k']))\n"
+        "print(traceback.TracebackException.__init__ is not original)\n"
+    )
+    result = run_python(["-c", script], env=env)
+    assert result.stdout.split() == ["False"] * 5
+    assert "KeyError" in result.stderr
+
+
+def test_capture_and_format_events():
+    inner = ExceptionGroup("inner", [raise_value_error("A")], ["a"])
+    group = ExceptionGroup("outer", [inner, KeyError()], ["inner", "k"])
+    events = []
+    add_instrumentation_hook(events.append)
+    try:
+        format_group(group)
+        # plain exceptions are not reported
+        "".join(traceback.format_exception(KeyError, KeyError(), None))
+    finally:
+        remove_instrumentation_hook(events.append)
+    assert [event["event"] for event in events] == ["capture", "format"]
+    for event in events:
+        assert (event["nodes"], event["depth"]) == (4, 2)
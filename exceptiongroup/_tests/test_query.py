@@ -0,0 +1,102 @@
+from exceptiongroup import (
+    ExceptionGroup,
+    contains,
+    count_by_type,
+    find_first,
+    iter_leaves,
+    split,
+)
+from exceptiongroup._query import leaf_index
+
+
+def make_tree():
+    value_a = ValueError("a")
+    key = KeyError("k")
+    value_b = ValueError("b")
+    inner = ExceptionGroup("inner", [key, value_b], ["key", "value b"])
+    outer = ExceptionGroup(
+        "outer", [value_a, inner, OSError()], ["value a", "inner", "os"]
+    )
+    return outer, value_a, key, value_b
+
+
+def test_iter_leaves():
+    outer, value_a, key, value_b = make_tree()
+    leaves = list(iter_leaves(outer))
+    assert leaves[:3] == [
+        (value_a, ("value a",)),
+        (key, ("inner", "key")),
+        (value_b, ("inner", "value b")),
+    ]
+    assert leaves[3][1] == ("os",)
+
+    assert list(iter_leaves(value_a)) == [(value_a, ())]
+    empty = ExceptionGroup("empty", [], [])
+    assert list(iter_leaves(empty)) == []
+
+
+def test_iter_leaves_deep():
+    group = ExceptionGroup("leaf", [ValueError()], ["leaf"])
+    for i in range(5000):
+        group = ExceptionGroup("deep", [group], [i])
+    ((leaf, path),) = iter_leaves(group)
+    assert isinstance(leaf, ValueError)
+    assert len(path) == 5001
+    assert path[:2] == (4999, 4998)
+
+
+def test_find_first_and_contains():
+    outer, value_a, key, value_b = make_tree()
+    assert find_first(ValueError, outer) is value_a
+    assert find_first(LookupError, outer) is key
+    assert find_first((KeyError, ValueError), outer) is value_a
+    not_a = lambda e: e is not value_a
+    assert find_first(ValueError, outer, match=not_a) is value_b
+    assert find_first(ZeroDivisionError, outer) is None
+    assert find_first(ValueError, value_a) is value_a
+    # groups themselves are never matched, like with split
+    assert find_first(ExceptionGroup, outer) is None
+
+    assert contains(OSError, outer)
+    assert not contains(TypeError, outer)
+    for exc_type in [ValueError, KeyError, TypeError, ExceptionGroup]:
+        matched, _ = split(exc_type, outer)
+        assert contains(exc_type, outer) == (matched is not None)
+
+
+def test_find_first_stops_early():
+    seen = []
+
+    def match(exc):
+        seen.append(exc)
+        return True
+
+    outer, value_a, key, value_b = make_tree()
+    assert find_first(Exception, outer, match=match) is value_a
+    assert seen == [value_a]
+
+
+def test_count_by_type():
+    outer, value_a, key, value_b = make_tree()
+    counts = count_by_type(outer)
+    assert list(counts.items()) == [
+        (ValueError, 2),
+        (KeyError, 1),
+        (OSError, 1),
+    ]
+    assert count_by_type(key) == {KeyError: 1}
+
+
+def test_leaf_index():
+    outer, value_a, key, value_b = make_tree()
+    assert leaf_index(outer) == ({ValueError, KeyError, OSError}, 4, False)
+    inner = outer.exceptions[1]
+    assert leaf_index(inner) == ({KeyError, ValueError}, 2, False)
+    empty = ExceptionGroup("empty", [], [])
+    assert leaf_index(empty) == (set(), 0, True)
+    holding_empty = ExceptionGroup("outer", [inner, empty], ["i", "e"])
+    assert leaf_index(holding_empty) == ({KeyError, ValueError}, 2, True)
+
+    # cached until exceptions are replaced anywhere
+    inner.exceptions = [TypeError()]
+    assert leaf_index(outer) == ({ValueError, TypeError, OSError}, 3, False)
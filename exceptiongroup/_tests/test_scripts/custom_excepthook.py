@@ -10,9 +10,13 @@ def custom_excepthook(*args):
 
 sys.excepthook = custom_excepthook
 
-# Should warn that we'll get kinda-broken tracebacks
 import exceptiongroup
 
+# Should warn that we'll get kinda-broken tracebacks.  Creating the first
+# group installs the hooks without warning, so only an explicit install()
+# does.
+exceptiongroup.install()
+
 # The custom excepthook should run, because we were polite and didn't
 # override it
 raise exceptiongroup.ExceptionGroup(
@@ -0,0 +1,123 @@
+import linecache
+import traceback
+
+import pytest
+
+from exceptiongroup import ExceptionGroup
+from exceptiongroup import _source
+from exceptiongroup._source import SourceLines
+from ._common import raise_value_error
+
+
+def raise_chained():
+    try:
+        try:
+            raise KeyError("context")
+        except KeyError:
+            raise raise_value_error("chained")
+    except ValueError as e:
+        return e
+
+
+def stack_lines(stack):
+    return [
+        (frame.filename, frame.lineno, frame.name, frame.line)
+        for frame in stack
+    ]
+
+
+def test_source_lines():
+    chained = raise_chained()
+    group = ExceptionGroup(
+        "many error.",
+        [raise_value_error("a"), ExceptionGroup("nested", [chained], ["c"])],
+        ["a", "nested"],
+    )
+    source_lines = SourceLines([group])
+    for exc in [group.exceptions[0], chained, chained.__context__]:
+        expected = traceback.extract_tb(exc.__traceback__)
+        stack = source_lines.extract(exc.__traceback__)
+        assert stack_lines(stack) == stack_lines(expected)
+    assert stack_lines(
+        source_lines.extract(chained.__traceback__, limit=-1)
+    ) == stack_lines(traceback.extract_tb(chained.__traceback__, limit=-1))
+
+    # frames that weren't in the tree are looked up as usual
+    other = raise_chained()
+    assert stack_lines(source_lines.extract(other.__traceback__)) == (
+        stack_lines(traceback.extract_tb(other.__traceback__))
+    )
+
+
+def test_source_lines_only_for_shown_frames():
+    leaves = [raise_value_error(i) for i in range(3)]
+    inner = ExceptionGroup("inner", leaves, ["a", "b", "c"])
+    try:
+        raise inner
+    except ExceptionGroup:
+        pass
+
+    def tracebacks(**limits):
+        return list(_source._tracebacks([inner], 1, **limits))
+
+    everything = [inner.__traceback__] + [e.__traceback__ for e in leaves]
+    assert tracebacks(max_children=None, max_depth=None) == everything
+    assert tracebacks(max_children=2, max_depth=2) == everything[:3]
+    assert tracebacks(max_children=None, max_depth=1) == everything[:1]
+
+    chained = raise_chained()
+    lines = [
+        frame.line for frame in traceback.extract_tb(chained.__traceback__)
+    ]
+    assert len(lines) == 2
+    for limit, shown in [(1, lines[:1]), (-1, lines[-1:])]:
+        source_lines = SourceLines([chained], limit=limit)
+        assert sorted(source_lines._lines.values()) == sorted(
+            shown + ['raise KeyError("context")']
+        )
+
+
+def raise_from_generated(tmp_path, name, lines, newline="\n"):
+    """Raise ValueError from the last line of a generated module."""
+    path = tmp_path / name
+    source = newline.join(lines + ["raise ValueError('generated')", ""])
+    path.write_bytes(source.encode("utf-8"))
+    code = compile(source, str(path), "exec")
+    try:
+        exec(code, {})
+    except ValueError as e:
+        return e
+
+
+@pytest.fixture
+def mmap_everything(monkeypatch):
+    monkeypatch.setattr(_source, "MMAP_THRESHOLD", 0)
+
+
+def test_source_lines_mapped(tmp_path, mmap_everything):
+    lines = ["x{} = {}".format(i, i) for i in range(20000)]
+    exc = raise_from_generated(tmp_path, "generated.py", lines)
+    filename = str(tmp_path / "generated.py")
+    source_lines = SourceLines([exc])
+    # read without going through linecache
+    assert filename not in linecache.cache
+    line = "raise ValueError('generated')"
+    assert source_lines.line(filename, 20001) == line
+    assert source_lines.extract(exc.__traceback__)[-1].line == line
+
+    mapped = _source._load_mapped(filename, {1, 100, 20001, 20002, 30000})
+    assert sorted(mapped) == [
+        (1, "x0 = 0"),
+        (100, "x99 = 99"),
+        (20001, "raise ValueError('generated')"),
+        (20002, ""),
+        (30000, ""),
+    ]
+
+
+def test_source_lines_mapped_falls_back(tmp_path, mmap_everything):
+    exc = raise_from_generated(tmp_path, "cr.py", ["x = 1"], newline="\r")
+    filename = str(tmp_path / "cr.py")
+    assert _source._load_mapped(filename, {2}) is None
+    source_lines = SourceLines([exc])
+    assert source_lines.line(filename, 2) == "raise ValueError('generated')"
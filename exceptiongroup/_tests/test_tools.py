@@ -1,5 +1,18 @@
+import abc
+import gc
+import sys
+import traceback
+import weakref
 import pytest
-from exceptiongroup import ExceptionGroup, split
+from exceptiongroup import (
+    ExceptionGroup,
+    catch,
+    open_handler,
+    partition,
+    set_split_cache,
+    split,
+)
+from exceptiongroup import _tools
 
 
 def raise_error(err):
@@ -51,12 +64,12 @@ def test_split_when_contains_matched_and_unmatched():
     matched, unmatched = split(RuntimeError, group)
     assert isinstance(matched, ExceptionGroup)
     assert isinstance(unmatched, ExceptionGroup)
-    assert matched.exceptions == [error1]
+    assert matched.exceptions == (error1,)
     assert matched.message == "Many Errors"
-    assert matched.sources == ["Runtime Error1"]
-    assert unmatched.exceptions == [error2]
+    assert matched.sources == ("Runtime Error1",)
+    assert unmatched.exceptions == (error2,)
     assert unmatched.message == "Many Errors"
-    assert unmatched.sources == ["Value Error2"]
+    assert unmatched.sources == ("Value Error2",)
 
 
 def test_split_with_predicate():
@@ -69,8 +82,8 @@ def test_split_with_predicate():
         "Many Errors", [error1, error2], ["skip", "Runtime Error"]
     )
     matched, unmatched = split(RuntimeError, group, match=_match)
-    assert matched.exceptions == [error2]
-    assert unmatched.exceptions == [error1]
+    assert matched.exceptions == (error2,)
+    assert unmatched.exceptions == (error1,)
 
 
 def test_split_with_single_exception():
@@ -113,3 +126,620 @@ def test_split_and_check_attributes_same():
     assert unmatched.__cause__ is new_group.__cause__
     assert unmatched.__context__ is new_group.__context__
     assert unmatched.__suppress_context__ is new_group.__suppress_context__
+
+
+def test_split_deeply_nested_group():
+    depth = sys.getrecursionlimit() * 2
+    error1 = RuntimeError("Runtime Error1")
+    error2 = ValueError("Value Error2")
+    group = ExceptionGroup("inner", [error1, error2], ["error1", "error2"])
+    for i in range(depth):
+        group = ExceptionGroup("level {}".format(i), [group], ["nested"])
+
+    matched, unmatched = split(RuntimeError, group)
+    for _ in range(depth):
+        assert matched.sources == ("nested",)
+        assert unmatched.sources == ("nested",)
+        (matched,) = matched.exceptions
+        (unmatched,) = unmatched.exceptions
+    assert matched.exceptions == (error1,)
+    assert unmatched.exceptions == (error2,)
+
+    matched, unmatched = split(BaseException, group)
+    assert matched is group
+    assert unmatched is None
+
+
+def test_split_only_rebuilds_diverging_groups():
+    error1 = RuntimeError("Runtime Error1")
+    error2 = ValueError("Value Error2")
+    all_runtime = ExceptionGroup("runtime", [error1], ["error1"])
+    all_value = ExceptionGroup("value", [error2], ["error2"])
+    group = ExceptionGroup(
+        "Many Errors", [all_runtime, all_value], ["runtime", "value"]
+    )
+    matched, unmatched = split(RuntimeError, group)
+    assert matched.exceptions[0] is all_runtime
+    assert matched.sources == ("runtime",)
+    assert unmatched.exceptions[0] is all_value
+    assert unmatched.sources == ("value",)
+
+
+def test_split_decided_by_leaf_index(monkeypatch):
+    frames = []
+    frame_class = _tools._PartitionFrame
+
+    def recording_frame(*args):
+        frames.append(args[0])
+        return frame_class(*args)
+
+    monkeypatch.setattr(_tools, "_PartitionFrame", recording_frame)
+    inner = ExceptionGroup("inner", [KeyError(), IndexError()], ["k", "i"])
+    group = ExceptionGroup("outer", [inner, KeyError()], ["inner", "k"])
+
+    assert split(LookupError, group) == (group, None)
+    assert split(ValueError, group) == (None, group)
+    with catch(LookupError, lambda exc: None):
+        raise group
+    assert frames == []
+
+    # needs a look at the instances, or divides the tree
+    split(LookupError, group, match=lambda exc: True)
+    assert frames
+    del frames[:]
+    matched, rest = split(KeyError, group)
+    assert frames
+    assert rest.exceptions[0].exceptions == (inner.exceptions[1],)
+
+    # replacing the exceptions of a nested group is noticed
+    inner.exceptions = [ValueError()]
+    matched, rest = split(LookupError, group)
+    assert rest.exceptions[0] is inner
+
+
+def test_split_after_children_change():
+    group = ExceptionGroup("group", [ValueError(1)], ["a"])
+    assert split(ValueError, group) == (group, None)
+    # the children can't be changed in place, behind the leaf index's back
+    with pytest.raises(AttributeError):
+        group.exceptions.append(KeyError(2))
+    with pytest.raises(TypeError):
+        group.exceptions[0] = KeyError(2)
+    group.exceptions += (KeyError(2),)
+    group.sources += ("b",)
+    matched, rest = split(ValueError, group)
+    assert matched.exceptions == group.exceptions[:1]
+    assert rest.exceptions == group.exceptions[1:]
+
+    caught = []
+    with pytest.raises(ExceptionGroup) as excinfo:
+        with catch(ValueError, caught.append):
+            raise group
+    assert [exc.exceptions for exc in caught] == [group.exceptions[:1]]
+    assert excinfo.value.exceptions == group.exceptions[1:]
+
+    # nor can they change behind its back through args
+    group.args = ("group", (KeyError(3),), ("c",))
+    assert split(ValueError, group) == (None, group)
+    with pytest.raises(ExceptionGroup) as excinfo:
+        with catch(ValueError, caught.append):
+            raise group
+    assert excinfo.value is group
+
+
+def test_split_with_empty_nested_group():
+    empty = ExceptionGroup("empty", [], [])
+    group = ExceptionGroup("outer", [ValueError(), empty], ["v", "e"])
+    for _ in range(2):
+        # the second time around, the leaf index is cached
+        matched, rest = split(ValueError, group)
+        assert matched is not group
+        assert matched.exceptions[0] is group.exceptions[0]
+        assert matched.exceptions[1].exceptions == ()
+        assert matched.exceptions[1] is not empty
+        assert rest.sources == ("e",)
+        assert rest.exceptions[0].exceptions == ()
+
+
+@pytest.fixture
+def split_cache():
+    set_split_cache(2)
+    yield
+    set_split_cache(None)
+
+
+def mixed_group():
+    inner = ExceptionGroup("inner", [KeyError(), ValueError()], ["k", "v"])
+    return ExceptionGroup("outer", [inner, ValueError()], ["inner", "v"])
+
+
+def shape(exc):
+    if isinstance(exc, ExceptionGroup):
+        return exc.message, [shape(e) for e in exc.exceptions], exc.sources
+    return exc
+
+
+class CountingMatch:
+    def __init__(self):
+        self.calls = 0
+
+    def __call__(self, exc):
+        self.calls += 1
+        return True
+
+
+def test_split_cache_reuses_plans(split_cache):
+    group = mixed_group()
+    match = CountingMatch()
+    matched, rest = split(KeyError, group, match=match)
+    assert match.calls == 1
+    again = split(KeyError, group, match=match)
+    assert match.calls == 1
+    # the copies are made afresh
+    assert again[0] is not matched and again[1] is not rest
+    assert [shape(part) for part in again] == [shape(matched), shape(rest)]
+    assert again[1].exceptions[1] is group.exceptions[1]
+    # catch shares the cache
+    caught = []
+    with pytest.raises(ExceptionGroup) as excinfo:
+        with catch(KeyError, caught.append, match=match):
+            raise group
+    assert match.calls == 1
+    assert [shape(exc) for exc in caught] == [shape(matched)]
+    assert shape(excinfo.value) == shape(rest)
+    assert split(Exception, group) == (group, None)
+
+
+def test_split_cache_is_bounded_and_weak(split_cache):
+    group = mixed_group()
+    match = CountingMatch()
+    split(KeyError, group, match=match)
+    split(ValueError, group)
+    split(Exception, group)
+    # KeyError was the least recently used query
+    queries = _tools._split_cache[group]
+    assert list(queries) == [(ValueError, None), (Exception, None)]
+    split(KeyError, group, match=match)
+    assert match.calls == 2
+
+    del group, queries
+    gc.collect()
+    assert len(_tools._split_cache) == 0
+
+
+def raised_group():
+    group = ExceptionGroup(
+        "many error.", [KeyError(), ValueError()], ["k", "v"]
+    )
+    try:
+        raise group
+    except ExceptionGroup as e:
+        return e
+
+
+def test_split_cache_doesnt_keep_raised_groups(split_cache):
+    # the group's frame refers to the group, so nothing cached may refer to
+    # the frame
+    group = raised_group()
+    split(ValueError, group)
+    ref = weakref.ref(group)
+    del group
+    gc.collect()
+    assert ref() is None
+
+
+def catch_repeatedly():
+    group = raised_group()
+    lengths = []
+    for _ in range(3):
+        try:
+            with catch(KeyError, lambda exc: None):
+                raise group
+        except ExceptionGroup as rest:
+            lengths.append(len(list(traceback.walk_tb(rest.__traceback__))))
+        group.__context__ = None
+    return lengths
+
+
+def test_split_cache_with_catch_raising_rest():
+    uncached = catch_repeatedly()
+    set_split_cache(2)
+    try:
+        assert catch_repeatedly() == uncached
+    finally:
+        set_split_cache(None)
+
+
+def test_split_cache_invalidation(split_cache):
+    group = mixed_group()
+    matched, _ = split(KeyError, group)
+    group.exceptions[0].exceptions = [TypeError()]
+    assert split(KeyError, group) == (None, group)
+
+    # cached plans refer to children by position
+    group = mixed_group()
+    split(ValueError, group)
+    inner = group.exceptions[0]
+    inner.exceptions = inner.exceptions[:1]
+    inner.sources = inner.sources[:1]
+    matched, rest = split(ValueError, group)
+    assert matched.exceptions == (group.exceptions[1],)
+    assert rest.exceptions == (inner,)
+    inner.exceptions = (ValueError(),) + inner.exceptions
+    inner.sources = ("v",) + inner.sources
+    matched, rest = split(ValueError, group)
+    assert matched.exceptions[0].exceptions == inner.exceptions[:1]
+    assert rest.exceptions[0].exceptions == inner.exceptions[1:]
+    inner.args = ("inner", (KeyError(),), ("k",))
+    matched, rest = split(ValueError, group)
+    assert matched.exceptions == (group.exceptions[1],)
+    assert rest.exceptions == (inner,)
+
+    # unhashable predicates just aren't cached
+    class Unhashable:
+        __hash__ = None
+
+        def __call__(self, exc):
+            return True
+
+    split(KeyError, group, match=Unhashable())
+
+    set_split_cache(None)
+    assert _tools._split_cache is None
+    with pytest.raises(ValueError):
+        set_split_cache(0)
+
+
+def test_partition_for_none_exception_should_raise_type_error():
+    with pytest.raises(TypeError):
+        partition({RuntimeError: None}, None)
+
+
+def test_partition_into_several_types():
+    error1 = RuntimeError("Runtime Error1")
+    error2 = ValueError("Value Error2")
+    error3 = KeyError("Key Error3")
+    error4 = RuntimeError("Runtime Error4")
+    inner = ExceptionGroup("inner", [error3, error4], ["error3", "error4"])
+    group = ExceptionGroup(
+        "Many Errors", [error1, error2, inner], ["error1", "error2", "inner"]
+    )
+    parts, rest = partition({RuntimeError: None, ValueError: None}, group)
+    assert list(parts) == [RuntimeError, ValueError]
+
+    assert parts[RuntimeError].exceptions[0] is error1
+    assert parts[RuntimeError].sources == ("error1", "inner")
+    assert parts[RuntimeError].exceptions[1].exceptions == (error4,)
+    assert parts[RuntimeError].exceptions[1].sources == ("error4",)
+    assert parts[ValueError].exceptions == (error2,)
+    assert parts[ValueError].sources == ("error2",)
+    assert rest.exceptions[0].exceptions == (error3,)
+    assert rest.sources == ("inner",)
+
+
+def test_partition_first_matching_entry_wins():
+    def _match(err):
+        return str(err) != "skip"
+
+    error1 = RuntimeError("skip")
+    error2 = RuntimeError("Runtime Error")
+    group = ExceptionGroup(
+        "Many Errors", [error1, error2], ["skip", "Runtime Error"]
+    )
+    parts, rest = partition(
+        {RuntimeError: _match, (RuntimeError, ValueError): None}, group
+    )
+    assert parts[RuntimeError].exceptions == (error2,)
+    assert parts[(RuntimeError, ValueError)].exceptions == (error1,)
+    assert rest is None
+
+
+def test_partition_with_single_exception():
+    err = RuntimeError("Error")
+    parts, rest = partition({ValueError: None, RuntimeError: None}, err)
+    assert parts == {ValueError: None, RuntimeError: err}
+    assert rest is None
+
+    parts, rest = partition({ValueError: None}, err)
+    assert parts == {ValueError: None}
+    assert rest is err
+
+
+def test_partition_and_check_attributes_same():
+    group = ExceptionGroup(
+        "ErrorGroup",
+        [RuntimeError("RuntimeError"), ValueError("ValueError")],
+        ["RuntimeError", "ValueError"],
+    )
+    try:
+        raise_error_from_another(group, RuntimeError("Cause"))
+    except BaseException as e:
+        new_group = e
+
+    parts, rest = partition({RuntimeError: None}, group)
+    for part in [parts[RuntimeError], rest]:
+        assert part is not new_group
+        assert part.message == "ErrorGroup"
+        assert part.__traceback__ is new_group.__traceback__
+        assert part.__cause__ is new_group.__cause__
+        assert part.__context__ is new_group.__context__
+        assert part.__suppress_context__ is new_group.__suppress_context__
+
+    parts, rest = partition({RuntimeError: None, ValueError: None}, group)
+    assert rest is None
+    assert parts[RuntimeError].exceptions == (group.exceptions[0],)
+    assert parts[ValueError].exceptions == (group.exceptions[1],)
+
+
+def test_split_with_tuple_of_exception_types():
+    error1 = RuntimeError("Runtime Error1")
+    error2 = ValueError("Value Error2")
+    error3 = KeyError("Key Error3")
+    group = ExceptionGroup(
+        "Many Errors", [error1, error2, error3], ["error1", "error2", "error3"]
+    )
+    for _ in range(2):
+        matched, unmatched = split((RuntimeError, (LookupError,)), group)
+        assert matched.exceptions == (error1, error3)
+        assert unmatched.exceptions == (error2,)
+
+
+def test_split_with_abc_exception_type():
+    class AbstractError(abc.ABC):
+        pass
+
+    class ConcreteError(Exception):
+        pass
+
+    group = ExceptionGroup(
+        "Many Errors", [ConcreteError(), ValueError()], ["concrete", "value"]
+    )
+    matched, unmatched = split(AbstractError, group)
+    assert matched is None
+
+    AbstractError.register(ConcreteError)
+    matched, unmatched = split(AbstractError, group)
+    assert matched.exceptions == (group.exceptions[0],)
+    assert unmatched.exceptions == (group.exceptions[1],)
+
+
+def test_split_aggregated_group():
+    errors = [RuntimeError("Runtime Error")] * 3 + [ValueError("Value Error")]
+    group = ExceptionGroup("Many Errors", errors, ["a", "b", "c", "d"])
+    aggregated = group.aggregate()
+    matched, unmatched = split(RuntimeError, aggregated)
+    assert matched.exceptions == (errors[0],)
+    assert matched.sources == (("a", "b", "c"),)
+    assert matched.sources[0].count == 3
+    assert unmatched.exceptions == (errors[3],)
+    assert unmatched.sources == ("d",)
+
+
+def test_handler_chain_without_exception():
+    with open_handler() as handler:
+
+        @handler.handle(RuntimeError)
+        def handle_runtime_error(exc):
+            raise AssertionError("should not be called")
+
+
+def test_handler_chain_dispatches_in_one_pass():
+    error1 = RuntimeError("Runtime Error1")
+    error2 = ValueError("Value Error2")
+    error3 = KeyError("Key Error3")
+    error4 = RuntimeError("Runtime Error4")
+    inner = ExceptionGroup("inner", [error3, error4], ["error3", "error4"])
+    group = ExceptionGroup(
+        "Many Errors", [error1, error2, inner], ["error1", "error2", "inner"]
+    )
+    handled = {}
+
+    with pytest.raises(ExceptionGroup) as excinfo:
+        with open_handler() as handler:
+
+            @handler.handle(RuntimeError)
+            def handle_runtime_error(exc):
+                handled[RuntimeError] = exc
+
+            @handler.handle(ValueError)
+            def handle_value_error(exc):
+                handled[ValueError] = exc
+
+            raise group
+
+    assert handled[RuntimeError].exceptions[0] is error1
+    assert handled[RuntimeError].exceptions[1].exceptions == (error4,)
+    assert handled[ValueError].exceptions == (error2,)
+    rest = excinfo.value
+    assert rest.sources == ("inner",)
+    assert rest.exceptions[0].exceptions == (error3,)
+
+
+def test_handler_chain_first_matching_handler_wins():
+    error1 = RuntimeError("skip")
+    error2 = RuntimeError("Runtime Error")
+    group = ExceptionGroup("Many Errors", [error1, error2], ["skip", "other"])
+    handled = []
+
+    with open_handler() as handler:
+
+        @handler.handle(RuntimeError, match=lambda exc: str(exc) != "skip")
+        def handle_runtime_error(exc):
+            handled.append(("runtime", exc.exceptions))
+
+        @handler.handle(Exception)
+        def handle_exception(exc):
+            handled.append(("exception", exc.exceptions))
+
+        raise group
+
+    assert handled == [("runtime", (error2,)), ("exception", (error1,))]
+
+
+def test_handler_chain_unhandled_exception_propagates():
+    error = KeyError("Key Error")
+    with pytest.raises(KeyError) as excinfo:
+        with open_handler() as handler:
+
+            @handler.handle(RuntimeError)
+            def handle_runtime_error(exc):
+                pass
+
+            raise error
+    assert excinfo.value is error
+
+
+def test_handler_chain_handler_raises():
+    group = ExceptionGroup(
+        "Many Errors",
+        [RuntimeError("Runtime Error"), KeyError("Key Error")],
+        ["runtime", "key"],
+    )
+    with pytest.raises(ExceptionGroup) as excinfo:
+        with open_handler() as handler:
+
+            @handler.handle(RuntimeError)
+            def handle_runtime_error(exc):
+                raise ValueError("from handler")
+
+            raise group
+
+    new_exc, rest = excinfo.value.exceptions
+    assert excinfo.value.sources == (
+        "exception raised by handler",
+        "uncaught exceptions",
+    )
+    assert isinstance(new_exc, ValueError)
+    assert new_exc.__context__.exceptions == (group.exceptions[0],)
+    assert rest.exceptions == (group.exceptions[1],)
+
+
+def test_handler_chain_handler_reraises():
+    error1 = RuntimeError("Runtime Error")
+    error2 = ValueError("Value Error")
+    group = ExceptionGroup("Many Errors", [error1, error2], ["a", "b"])
+
+    with pytest.raises(ExceptionGroup) as excinfo:
+        with open_handler() as handler:
+
+            @handler.handle(RuntimeError)
+            def handle_runtime_error(exc):
+                raise
+
+            raise group
+    assert excinfo.value is group
+
+    with pytest.raises(ExceptionGroup) as excinfo:
+        with open_handler() as handler:
+
+            @handler.handle(RuntimeError)
+            def handle_runtime_error(exc):
+                raise
+
+            @handler.handle(ValueError)
+            def handle_value_error(exc):
+                pass
+
+            raise group
+    assert excinfo.value is not group
+    assert excinfo.value.exceptions == (error1,)
+
+
+def test_handler_chain_handlers_of_the_same_type():
+    error_a = ValueError("a")
+    error_b = ValueError("b")
+    group = ExceptionGroup("Many Errors", [error_a, error_b], ["a", "b"])
+    handled = []
+
+    with open_handler() as handler:
+
+        @handler.handle(ValueError, match=lambda exc: str(exc) == "a")
+        def handle_a(exc):
+            handled.append(("a", exc.exceptions))
+
+        @handler.handle(ValueError, match=lambda exc: str(exc) == "b")
+        def handle_b(exc):
+            handled.append(("b", exc.exceptions))
+
+        raise group
+    assert handled == [("a", (error_a,)), ("b", (error_b,))]
+
+
+def test_catch_without_exception():
+    def handler(exc):
+        raise AssertionError("should not be called")
+
+    with catch(RuntimeError, handler):
+        pass
+
+
+def test_catch_single_exception():
+    handled = []
+    error = RuntimeError("Runtime Error")
+    with catch(RuntimeError, handled.append):
+        raise error
+    assert handled == [error]
+
+    with pytest.raises(ValueError):
+        with catch(RuntimeError, handled.append):
+            raise ValueError("Value Error")
+
+    with pytest.raises(RuntimeError):
+        with catch(RuntimeError, handled.append, match=lambda exc: False):
+            raise RuntimeError("skip")
+    assert handled == [error]
+
+
+def test_catch_handler_raises_new_exception():
+    error = RuntimeError("Runtime Error")
+
+    def handler(exc):
+        raise ValueError("from handler")
+
+    with pytest.raises(ValueError) as excinfo:
+        with catch(RuntimeError, handler):
+            raise error
+    assert excinfo.value.__context__ is error
+
+
+def test_catch_handler_reraises():
+    def handler(exc):
+        raise
+
+    try:
+        raise_error(RuntimeError("Runtime Error"))
+    except RuntimeError as e:
+        error = e
+
+    with pytest.raises(RuntimeError) as excinfo:
+        with catch(RuntimeError, handler):
+            raise error
+    assert excinfo.value is error
+    assert error.__context__ is None
+
+    # the part passed to the handler is raised again to run the handler, but
+    # its traceback is restored afterwards
+    saved_traceback = error.__traceback__
+    group = ExceptionGroup("Many Errors", [error, KeyError()], ["a", "b"])
+    with pytest.raises(ExceptionGroup) as excinfo:
+        with catch(RuntimeError, handler):
+            raise group
+    assert excinfo.value is group
+    assert group.exceptions[0].__traceback__ is saved_traceback
+
+
+def test_catch_group():
+    error1 = RuntimeError("Runtime Error")
+    error2 = ValueError("Value Error")
+    group = ExceptionGroup("Many Errors", [error1, error2], ["a", "b"])
+    handled = []
+
+    with pytest.raises(ExceptionGroup) as excinfo:
+        with catch(RuntimeError, handled.append):
+            raise group
+    assert handled[0].exceptions == (error1,)
+    assert excinfo.value.exceptions == (error2,)
+
+    with catch((RuntimeError, ValueError), handled.append):
+        raise group
+    assert handled[1] is group
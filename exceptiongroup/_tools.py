@@ -2,10 +2,16 @@
 # Core primitives for working with ExceptionGroups
 ################################################################
 
-import copy
+import itertools
+import threading
+import weakref
 from functools import wraps
 from collections import OrderedDict
+from time import perf_counter
 from . import ExceptionGroup
+from . import _instrument
+from ._instrument import hooks
+from ._query import leaf_index
 
 
 def split(exc_type, exc, *, match=None):
@@ -27,60 +33,381 @@ def split(exc_type, exc, *, match=None):
         raise TypeError(
             "Argument `exc` should be an instance of BaseException."
         )
-    if isinstance(exc, ExceptionGroup):
-        matches = []
-        match_notes = []
-        rests = []
-        rest_notes = []
-        for subexc, note in zip(exc.exceptions, exc.sources):
-            matched, rest = split(exc_type, subexc, match=match)
-            if matched is not None:
-                matches.append(matched)
-                match_notes.append(note)
-            if rest is not None:
-                rests.append(rest)
-                rest_notes.append(note)
-        if matches and not rests:
-            return exc, None
-        elif rests and not matches:
-            return None, exc
-        else:
-            matched_group = copy.copy(exc)
-            matched_group.exceptions = matches
-            matched_group.sources = match_notes
-            rest_group = copy.copy(exc)
-            rest_group.exceptions = rests
-            rest_group.sources = rest_notes
-            return matched_group, rest_group
+    start = perf_counter() if hooks else None
+    matched, rest = _split_tree(
+        _Dispatch([(exc_type, match)]), (exc_type, match), exc
+    )
+    if start is not None:
+        _instrument.report("split", exc, perf_counter() - start)
+    return matched, rest
+
+
+def partition(matchers, exc):
+    """ partitions the exception into several parts in a single pass, one for
+    each exception type in `matchers`, plus a remainder for everything that
+    none of them accept.
+
+    Args:
+        matchers (dict): Maps an exception type (or a tuple of exception
+            types) to a match predicate, or None to accept every exception of
+            that type.  Each exception goes to the first entry, in dict order,
+            whose type and predicate accept it.
+        exc (BaseException): Exception object we want to partition.
+
+    Returns:
+        A tuple ``(parts, rest)``, where `parts` is a dict that maps each key
+        of `matchers` to its part of `exc` (or None if nothing matched it),
+        and `rest` holds whatever no entry accepted (or None).  Like with
+        :func:`split`, the parts of an ExceptionGroup keep its ``sources``,
+        ``__traceback__``, ``__cause__`` and ``__context__``.
+    """
+    if not isinstance(exc, BaseException):
+        raise TypeError(
+            "Argument `exc` should be an instance of BaseException."
+        )
+    start = perf_counter() if hooks else None
+    dispatch = _Dispatch(matchers.items())
+    results = _partition_tree(dispatch, exc)
+    if start is not None:
+        _instrument.report("partition", exc, perf_counter() - start)
+    parts = OrderedDict(zip(matchers, results))
+    return parts, results[dispatch.rest_index]
+
+
+# The split cache, see set_split_cache: maps each group to an OrderedDict of
+# the plans of its most recently used queries, or is None when the cache is
+# off.
+_split_cache = None
+_split_cache_size = 0
+_split_cache_lock = threading.Lock()
+
+
+def set_split_cache(maxsize=None):
+    """ Turns the split cache on or off.
+
+    With the cache on, splitting an ExceptionGroup with the same exception
+    type and match predicate as before, with :func:`split` or :func:`catch`,
+    reuses how the group was divided the last time instead of matching its
+    leaves again.  Only that plan is remembered, not the results: the groups
+    that were copied are copied afresh for every call, just as without the
+    cache.  The cache only holds groups weakly, and drops their entries once
+    they are garbage collected.
+
+    Turning the cache on or off empties it.
+
+    Args:
+        maxsize (int or None): How many distinct ``(exc_type, match)``
+            queries to remember for each group, evicting the least recently
+            used ones first; or None (the default) to turn the cache off.
+    """
+    global _split_cache, _split_cache_size
+    if maxsize is not None and maxsize < 1:
+        raise ValueError("maxsize must be None or at least 1")
+    with _split_cache_lock:
+        _split_cache_size = maxsize or 0
+        _split_cache = None if maxsize is None else weakref.WeakKeyDictionary()
+
+
+def _split_tree(dispatch, query, exc):
+    """ :func:`_partition_tree` for the single `query` that `dispatch` was
+    made from, through the split cache if it's on.
+    """
+    cache = _split_cache
+    if cache is None or not isinstance(exc, ExceptionGroup):
+        return _partition_tree(dispatch, exc)
+    generation = ExceptionGroup._exceptions_generation
+    try:
+        with _split_cache_lock:
+            queries = cache.get(exc)
+            entry = None if queries is None else queries.get(query)
+            if entry is not None:
+                queries.move_to_end(query)
+    except TypeError:
+        # unhashable match predicate
+        return _partition_tree(dispatch, exc)
+    if entry is not None and entry[0] == generation:
+        plans = entry[1]
     else:
-        if isinstance(exc, exc_type) and (match is None or match(exc)):
-            return exc, None
+        plans = tuple(
+            True if part is exc else part
+            for part in _partition_tree(dispatch, exc, _PlanFrame)
+        )
+        with _split_cache_lock:
+            if cache is _split_cache:
+                queries = cache.get(exc)
+                if queries is None:
+                    queries = cache[exc] = OrderedDict()
+                queries[query] = (generation, plans)
+                queries.move_to_end(query)
+                if len(queries) > _split_cache_size:
+                    queries.popitem(last=False)
+    return [_build_part(exc, plan) for plan in plans]
+
+
+def _build_part(group, plan):
+    """ Builds the part of `group` described by `plan`, see
+    :class:`_PlanFrame`.
+    """
+    if plan is None or plan is True:
+        return None if plan is None else group
+    stack = [_PlanBuilder(group, plan, None)]
+    while True:
+        builder = stack[-1]
+        for slot, child_plan in builder.nested:
+            child = builder.exceptions[slot]
+            stack.append(_PlanBuilder(child, child_plan, slot))
+            break
         else:
-            return None, exc
+            stack.pop()
+            built = builder.group._derive(builder.exceptions, builder.sources)
+            if not stack:
+                return built
+            stack[-1].exceptions[builder.slot] = built
+
+
+class _PlanBuilder:
+    """ One group being copied by :func:`_build_part`.  Its copy starts out
+    with the children picked by the plan, and those that are only partly
+    included are replaced by their own copies as they are finished.
+    """
+
+    __slots__ = ("group", "exceptions", "sources", "nested", "slot")
+
+    def __init__(self, group, plan, slot):
+        positions, nested = plan
+        exceptions = group.exceptions
+        sources = group.sources
+        self.group = group
+        self.exceptions = [exceptions[i] for i in positions]
+        self.sources = [sources[i] for i in positions]
+        self.nested = iter(nested)
+        self.slot = slot
+
+
+def _partition_tree(dispatch, exc, frame_type=None):
+    """ The traversal engine behind :func:`split` and :func:`partition`.
+
+    `dispatch` is a :class:`_Dispatch` that files every leaf exception into a
+    bucket, and the result is a list holding each bucket's part of `exc` (or
+    None).
+
+    Walks the tree with an explicit stack instead of recursing, so arbitrarily
+    deep groups don't hit the recursion limit.  Groups are only rebuilt where
+    their children actually diverge: a group whose leaves all land in one
+    bucket is passed through as-is.  When the types of the leaves are enough
+    to tell that of the whole tree, the cached leaf index answers without a
+    walk (see :func:`_query.leaf_index`).
+
+    With `frame_type` :class:`_PlanFrame`, the parts of a group are described
+    by plans instead of being built (though a part that is the whole group
+    may still be the group itself).
+    """
+    if frame_type is None:
+        frame_type = _PartitionFrame
+    nbuckets = dispatch.rest_index + 1
+    if not isinstance(exc, ExceptionGroup):
+        results = [None] * nbuckets
+        results[dispatch.classify(exc)] = exc
+        return results
+
+    # Maps each concrete leaf class seen during this call to its plan, see
+    # _Dispatch.plan.
+    plans = {}
+
+    # If the types of the leaves alone send them all to the same bucket, the
+    # whole group goes there, and there's no need to walk it.  Not so if it
+    # holds an empty group, which is split into a copy on every side (see
+    # _PartitionFrame.results).
+    leaf_types, leaf_count, has_empty_group = leaf_index(exc)
+    if leaf_count and not has_empty_group:
+        buckets = set()
+        for leaf_type in leaf_types:
+            plan = plans[leaf_type] = dispatch.plan(leaf_type)
+            buckets.add(plan if plan.__class__ is int else None)
+        if len(buckets) == 1 and None not in buckets:
+            results = [None] * nbuckets
+            results[buckets.pop()] = exc
+            return results
+
+    stack = [frame_type(exc, None, nbuckets)]
+    while True:
+        frame = stack[-1]
+        for subexc, note in frame.children:
+            if isinstance(subexc, ExceptionGroup):
+                stack.append(frame_type(subexc, note, nbuckets))
+                break
+            leaf_type = type(subexc)
+            try:
+                plan = plans[leaf_type]
+            except KeyError:
+                plan = plans[leaf_type] = dispatch.plan(leaf_type)
+            if plan.__class__ is not int:
+                plan = dispatch.run_plan(plan, subexc)
+            frame.add(plan, subexc, note)
+        else:
+            stack.pop()
+            results = frame.results()
+            if not stack:
+                return results
+            parent = stack[-1]
+            for index, result in enumerate(results):
+                if result is not None:
+                    parent.add(index, result, frame.source)
+
+
+class _PartitionFrame:
+    """ One ExceptionGroup being visited by :func:`_partition_tree`.
+
+    `source` is the note attached to the group by its parent, so the partial
+    results can be filed under the right note once the group is finished.
+    """
+
+    __slots__ = ("group", "source", "children", "exceptions", "notes")
+
+    def __init__(self, group, source, nbuckets):
+        self.group = group
+        self.source = source
+        self.children = iter(zip(group.exceptions, group.sources))
+        self.exceptions = [[] for _ in range(nbuckets)]
+        self.notes = [[] for _ in range(nbuckets)]
+
+    def add(self, index, exc, note):
+        self.exceptions[index].append(exc)
+        self.notes[index].append(note)
+
+    def results(self):
+        filled = [index for index, excs in enumerate(self.exceptions) if excs]
+        if len(filled) == 1:
+            results = [None] * len(self.exceptions)
+            results[filled[0]] = self.group
+            return results
+        # An empty group is split into empty copies on every side.
+        return [
+            self.group._derive(excs, notes) if excs or not filled else None
+            for excs, notes in zip(self.exceptions, self.notes)
+        ]
+
+
+class _PlanFrame(_PartitionFrame):
+    """ A :class:`_PartitionFrame` that describes the parts of its group
+    rather than building them, for the split cache.
+
+    The plan of a part is None if it is empty, True if it is the whole group,
+    or otherwise a tuple ``(positions, nested)``: the positions of the
+    children of the group that go into it, and ``(slot, plan)`` pairs for
+    the ones among them (by their index in `positions`) that only go into it
+    in part.  Plans don't refer to any exceptions, so they can't keep a group
+    or its frames alive.
+    """
+
+    __slots__ = ()
+
+    def __init__(self, group, source, nbuckets):
+        super().__init__(group, source, nbuckets)
+        # `source` is the group's position in its parent, and the positions
+        # of the children stand in for their sources.
+        self.children = zip(group.exceptions, itertools.count())
+
+    def results(self):
+        filled = [
+            index for index, parts in enumerate(self.exceptions) if parts
+        ]
+        if len(filled) == 1:
+            results = [None] * len(self.exceptions)
+            results[filled[0]] = True
+            return results
+        return [
+            _make_plan(parts, positions) if parts or not filled else None
+            for parts, positions in zip(self.exceptions, self.notes)
+        ]
+
+
+def _make_plan(parts, positions):
+    """ The plan for the `parts` of the children at `positions`, which are
+    either exceptions included whole or the plans of partly included groups.
+    """
+    nested = tuple(
+        (slot, part)
+        for slot, part in enumerate(parts)
+        if not isinstance(part, BaseException) and part is not True
+    )
+    return tuple(positions), nested
+
+
+class _Dispatch:
+    """ Files leaf exceptions into buckets.
+
+    Built from a sequence of ``(exc_type, match)`` entries: an exception goes
+    into the bucket of the first entry whose type and match predicate accept
+    it, or into the extra bucket at `rest_index` if none do.
+
+    The type half of that decision depends only on the exception's class, so
+    :func:`_partition_tree` makes it once per class and call, see
+    :meth:`plan`.
+    """
+
+    __slots__ = ("entries", "rest_index")
+
+    def __init__(self, entries):
+        self.entries = list(entries)
+        self.rest_index = len(self.entries)
+
+    def plan(self, leaf_type):
+        """ Returns either the bucket index for every exception of class
+        `leaf_type`, or if match predicates have to be consulted, a tuple of
+        ``(index, match)`` candidates to pass to :meth:`run_plan`.
+        """
+        candidates = []
+        for index, (exc_type, match) in enumerate(self.entries):
+            if issubclass(leaf_type, exc_type):
+                candidates.append((index, match))
+                if match is None:
+                    break
+        if not candidates:
+            return self.rest_index
+        if candidates[0][1] is None:
+            return candidates[0][0]
+        return tuple(candidates)
+
+    def run_plan(self, plan, exc):
+        for index, match in plan:
+            if match is None or match(exc):
+                return index
+        return self.rest_index
+
+    def classify(self, exc):
+        plan = self.plan(type(exc))
+        if plan.__class__ is not int:
+            plan = self.run_plan(plan, exc)
+        return plan
 
 
 class HandlerChain:
     """ An handler manager which chains many handlers.
 
-    Examples:
-        handler = HandlerChain()
+    When the ``with`` block exits with an exception, it is split up in a
+    single pass: each part of it goes to the first registered handler whose
+    exception type and match function accept it.  Anything that no handler
+    accepts is re-raised, together with any exceptions raised by the
+    handlers.
 
-        @handler.handle(RuntimeError)
-        def handler1(exc):
-            pass
+    Examples:
+        with HandlerChain() as handler:
+            @handler.handle(RuntimeError)
+            def handler1(exc):
+                pass
 
-        @handler.handle(ValueError)
-        def handler2(exc):
-            pass
+            @handler.handle(ValueError)
+            def handler2(exc):
+                pass
 
-        try:
-            ..
-        except BaseException:
-            handler.run()
+            ...
     """
 
     def __init__(self):
-        self._handlers = OrderedDict()
+        # (exc_type, match, fn) for each handler, in registration order
+        self._handlers = []
+        self._dispatch = _Dispatch([])
 
     def handle(self, exc_type, match=None):
         """ An decorator to chain decorated functions.
@@ -98,7 +425,10 @@ class HandlerChain:
             def wrapper(*args, **kwargs):
                 return fn(*args, **kwargs)
 
-            self._handlers[exc_type] = (match, fn)
+            self._handlers.append((exc_type, match, fn))
+            self._dispatch = _Dispatch(
+                (exc_type, match) for exc_type, match, _ in self._handlers
+            )
             return wrapper
 
         return decorator
@@ -106,8 +436,56 @@ class HandlerChain:
     def __enter__(self):
         return self
 
-    def __exit__(self, exc_type, exc, tb):
-        pass
+    # See the comments on Catcher.__exit__ for the cases this has to handle;
+    # the main difference is that there are several handlers to run.  A
+    # handler that re-raises its part of the exception leaves that part
+    # unhandled, and if nothing ends up handled we let the original exception
+    # propagate untouched.
+    def __exit__(self, etype, exc, tb):
+        __traceback_hide__ = True  # for pytest
+        if exc is None:
+            return False
+        parts = _partition_tree(self._dispatch, exc)
+        rest = parts.pop()
+        if rest is exc:
+            return False
+        raised = []
+        sources = []
+        handled = False
+        for (_, _, handler), caught in zip(self._handlers, parts):
+            if caught is None:
+                continue
+            handler_exc = _run_handler(handler, caught, handling=caught is exc)
+            if handler_exc is caught:
+                raised.append(caught)
+                sources.append("uncaught exceptions")
+                continue
+            handled = True
+            if handler_exc is not None:
+                raised.append(handler_exc)
+                sources.append("exception raised by handler")
+        if not handled:
+            return False
+        if rest is not None:
+            raised.append(rest)
+            sources.append("uncaught exceptions")
+        if not raised:
+            return True
+        if len(raised) == 1:
+            exceptiongroup_catch_exc = raised[0]
+        else:
+            exceptiongroup_catch_exc = ExceptionGroup._from_validated(
+                "exceptions raised while handling", raised, sources
+            )
+
+        # The 'raise' line here is arcane plumbling that regular end users
+        # will see in the middle of tracebacks, so we try to make it readable
+        # out-of-context.
+        saved_context = exceptiongroup_catch_exc.__context__
+        try:
+            raise exceptiongroup_catch_exc
+        finally:
+            exceptiongroup_catch_exc.__context__ = saved_context
 
 
 def open_handler():
@@ -137,6 +515,8 @@ class Catcher:
         self._exc_type = exc_type
         self._handler = handler
         self._match = match
+        # Only needed to split ExceptionGroups, so built on first use
+        self._dispatch = None
 
     def __enter__(self):
         pass
@@ -176,38 +556,29 @@ class Catcher:
     # sys.exc_info()[2] when the exception was caught. I think. (This is why
     # we restore caught.__traceback__ *after* the handler runs, because
     # otherwise it might reset the tb back to a mangled state.)
+    #
+    # catch() is often wrapped around hot code, so the common cases (no
+    # exception at all, or a plain exception) avoid the general machinery.
     def __exit__(self, etype, exc, tb):
         __traceback_hide__ = True  # for pytest
-        caught, rest = split(self._exc_type, exc, match=self._match)
+        if exc is None:
+            return False
+        start = perf_counter() if hooks else None
+        caught, rest = self._split(exc)
         if caught is None:
+            if start is not None:
+                self._report(exc, start, handled=False)
             return False
-        # 'raise caught' might mangle some of caught's attributes, and then
-        # handler() might mangle them more. So we save and restore them.
-        saved_caught_context = caught.__context__
-        saved_caught_traceback = caught.__traceback__
-        # Arrange that inside the handler, any new exceptions will get
-        # 'caught' as their __context__, and bare 'raise' will work.
-        try:
-            raise caught
-        except type(caught):
-            try:
-                self._handler(caught)
-            except BaseException as handler_exc:
-                if handler_exc is caught:
-                    return False
-                if rest is None:
-                    exceptiongroup_catch_exc = handler_exc
-                else:
-                    exceptiongroup_catch_exc = ExceptionGroup(
-                        "caught {}".format(self._exc_type.__class__.__name__),
-                        [handler_exc, rest],
-                        ["exception raised by handler", "uncaught exceptions"],
-                    )
-            else:
-                exceptiongroup_catch_exc = rest
-            finally:
-                caught.__context__ = saved_caught_context
-                caught.__traceback__ = saved_caught_traceback
+        handler_exc = _run_handler(
+            self._handler, caught, handling=caught is exc
+        )
+        if start is not None:
+            self._report(exc, start, handled=True)
+        if handler_exc is caught:
+            return False
+        exceptiongroup_catch_exc = self._remains(handler_exc, rest)
+        if exceptiongroup_catch_exc is None:
+            return True
 
         # The 'raise' line here is arcane plumbling that regular end users
         # will see in the middle of tracebacks, so we try to make it readable
@@ -218,6 +589,73 @@ class Catcher:
         finally:
             exceptiongroup_catch_exc.__context__ = saved_context
 
+    def _split(self, exc):
+        """ Returns the parts of `exc` that the handler does and doesn't
+        catch, like :func:`split`.
+        """
+        if not isinstance(exc, ExceptionGroup):
+            if not isinstance(exc, self._exc_type) or (
+                self._match is not None and not self._match(exc)
+            ):
+                return None, exc
+            return exc, None
+        if self._dispatch is None:
+            self._dispatch = _Dispatch([(self._exc_type, self._match)])
+        return _split_tree(self._dispatch, (self._exc_type, self._match), exc)
+
+    def _report(self, exc, start, handled):
+        _instrument.report(
+            "catch",
+            exc,
+            perf_counter() - start,
+            handler=_instrument.handler_name(self._handler),
+            handled=handled,
+        )
+
+    def _remains(self, handler_exc, rest):
+        """ Returns what should be raised after the handler ran, or None.
+        """
+        if handler_exc is None:
+            return rest
+        if rest is None:
+            return handler_exc
+        return ExceptionGroup._from_validated(
+            "caught {}".format(self._exc_type.__class__.__name__),
+            [handler_exc, rest],
+            ["exception raised by handler", "uncaught exceptions"],
+        )
+
+
+def _run_handler(handler, caught, handling=False):
+    """ Runs ``handler(caught)`` as if inside an ``except`` block that caught
+    `caught`, and returns the exception raised by the handler, if any.
+
+    If `handling` is true, `caught` is already the exception being handled
+    (as in the ``__exit__`` of the context manager it was raised in), so
+    there's no need to raise and catch it again first.
+    """
+    __traceback_hide__ = True  # for pytest
+    # 'raise caught' might mangle some of caught's attributes, and then
+    # handler() might mangle them more. So we save and restore them.
+    saved_caught_context = caught.__context__
+    saved_caught_traceback = caught.__traceback__
+    try:
+        if handling:
+            handler(caught)
+        else:
+            # Arrange that inside the handler, any new exceptions will get
+            # 'caught' as their __context__, and bare 'raise' will work.
+            try:
+                raise caught
+            except type(caught):
+                handler(caught)
+    except BaseException as handler_exc:
+        return handler_exc
+    finally:
+        caught.__context__ = saved_caught_context
+        caught.__traceback__ = saved_caught_traceback
+    return None
+
 
 def catch(exc_type, handler, match=None):
     """Return a context manager that catches and re-throws exception.